@@ -0,0 +1,88 @@
+"""
+Chunker benchmark: single-pass split_document vs the previous
+RecursiveCharacterTextSplitter + per-call tiktoken implementation.
+
+Usage (from backend/):
+    python benchmarks/bench_chunker.py                 # 100 KB, 500 KB, 1 MB
+    python benchmarks/bench_chunker.py --sizes-kb 1000 10000 --skip-baseline
+
+The baseline needs langchain-text-splitters, which the app itself no longer depends on.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiktoken
+from services.chunker import split_document
+
+WORDS = (
+    "the report finds revenue growth across regions while costs remain stable and "
+    "management expects further investment in infrastructure data analysis supply chain"
+).split()
+
+
+def make_text(size_bytes: int, seed: int = 42) -> str:
+    """Synthetic cleaned document: sentences -> lines -> paragraphs."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        paragraph = "\n".join(
+            ". ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))) for _ in range(rng.randint(1, 4))) + "."
+            for _ in range(rng.randint(1, 3))
+        )
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(parts)[:size_bytes]
+
+
+def baseline_chunk(text: str, chunk_size: int = 2000, chunk_overlap: int = 200) -> list:
+    """The implementation split_document replaced (kept here only for comparison)."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    def get_token_count(t: str) -> int:
+        encoder = tiktoken.get_encoding("cl100k_base")
+        return len(encoder.encode(t))
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=get_token_count,
+        separators=["\n\n", "\n", ". ", " "],
+    )
+    chunks = splitter.split_text(text)
+    # /upload also tokenized the whole text again for token_count
+    get_token_count(text)
+    return chunks
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--skip-baseline", action="store_true", help="Only time the new chunker")
+    args = parser.parse_args()
+
+    tiktoken.get_encoding("cl100k_base")  # warm the tokenizer file cache for both sides
+
+    print(f"{'size':>8} | {'new (s)':>8} | {'chunks':>6} | {'baseline (s)':>12} | {'chunks':>6} | speedup")
+    for size_kb in args.sizes_kb:
+        text = make_text(size_kb * 1024)
+        new, new_s = timed(split_document, text)
+        if args.skip_baseline:
+            print(f"{size_kb:>6}KB | {new_s:>8.3f} | {len(new['chunks']):>6} | {'-':>12} | {'-':>6} | -")
+            continue
+        old, old_s = timed(baseline_chunk, text)
+        print(
+            f"{size_kb:>6}KB | {new_s:>8.3f} | {len(new['chunks']):>6} | "
+            f"{old_s:>12.3f} | {len(old):>6} | {old_s / new_s:.1f}x"
+        )
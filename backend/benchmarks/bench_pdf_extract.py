@@ -0,0 +1,72 @@
+"""
+PDF extraction benchmark for the two paths /upload uses: pages parsed one by one in a
+thread (iter_pdf_pages) vs page ranges on the process pool (aiter_pdf_pages_parallel).
+
+Usage (from backend/):
+    python benchmarks/bench_pdf_extract.py                      # 50, 500, 2000 pages
+    PDF_PROCESS_WORKERS=8 python benchmarks/bench_pdf_extract.py --pages 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from config import PDF_PROCESS_WORKERS
+from services.pdf_parser import iter_pdf_pages, aiter_pdf_pages_parallel, shutdown_process_pool
+
+PARAGRAPH = (
+    "Quarterly results show steady growth in all regions. Operating costs were flat while "
+    "investment in infrastructure increased. The board recommends continuing the current plan. "
+)
+
+
+def make_pdf(page_count: int) -> bytes:
+    """Synthetic text-heavy PDF (~3 KB of text per page)."""
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"PAGE {i + 1}\n\n" + PARAGRAPH * 14, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def extract_in_thread(file_bytes: bytes) -> int:
+    return sum(len(page["text"]) for page in iter_pdf_pages(file_bytes))
+
+
+async def extract_parallel(file_bytes: bytes, page_count: int) -> int:
+    return sum([len(page["text"]) async for page in aiter_pdf_pages_parallel(file_bytes, page_count)])
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"CPUs available: {os.cpu_count()}, process workers: {PDF_PROCESS_WORKERS}")
+    # Warm up workers so process start-up isn't billed to the first document
+    await extract_parallel(make_pdf(2), 2)
+
+    print(f"{'pages':>6} | {'MB':>5} | {'thread (s)':>10} | {f'{PDF_PROCESS_WORKERS} procs (s)':>12}")
+    for page_count in args.pages:
+        pdf = make_pdf(page_count)
+        thread_timings, pool_timings = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            await asyncio.to_thread(extract_in_thread, pdf)
+            thread_timings.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await extract_parallel(pdf, page_count)
+            pool_timings.append(time.perf_counter() - started)
+        print(f"{page_count:>6} | {len(pdf) / 1e6:>5.1f} | {min(thread_timings):>10.3f} | {min(pool_timings):>12.3f}")
+
+    shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = parser.parse_args()
+    asyncio.run(main(args))
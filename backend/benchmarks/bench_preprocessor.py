@@ -0,0 +1,128 @@
+"""
+Preprocessor benchmark: single-pass StreamingPreprocessor vs the previous
+clean_text (4 passes) + detect_structure (string concatenation per section).
+
+Reports wall time, peak traced memory (tracemalloc) and the size of the stored
+structure (the old one copied every section's text, the new one keeps offsets).
+
+Usage (from backend/):
+    python benchmarks/bench_preprocessor.py                  # 1, 4, 16 MB
+    python benchmarks/bench_preprocessor.py --sizes-mb 8 32 --repeat 1
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.preprocessor import StreamingPreprocessor
+from services.session_store import deep_sizeof
+
+WORDS = (
+    "the report finds revenue growth across regions while costs remain stable and "
+    "management expects further investment in infrastructure data analysis supply chain"
+).split()
+
+
+def make_raw_text(size_bytes: int, seed: int = 42) -> str:
+    """Synthetic extracted PDF text: long sections, page numbers, stray spaces and non-ASCII quotes."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    page = 1
+    while total < size_bytes:
+        if rng.random() < 0.02:
+            block = f"SECTION {'ABCDEFGH'[rng.randrange(8)]} OVERVIEW"
+        elif rng.random() < 0.05:
+            block = f"\n{page}\n\n\n"
+            page += 1
+        else:
+            block = "  ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) + " “quoted”."
+        parts.append(block)
+        total += len(block) + 1
+    return "\n".join(parts)
+
+
+def legacy_clean_text(text: str) -> str:
+    """The implementation StreamingPreprocessor replaced (kept here only for comparison)."""
+    text = text.encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"^\s*\d+\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r" {2,}", " ", text)
+    return text.strip()
+
+
+def legacy_detect_structure(text: str) -> dict:
+    lines = text.split("\n")
+    sections = []
+    current_section = {"heading": "Introduction", "content": ""}
+    heading_pattern = re.compile(r"^[A-Z][A-Z\s]{2,}$")
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            current_section["content"] += "\n"
+            continue
+        if heading_pattern.match(stripped) and len(stripped) > 3:
+            if current_section["content"].strip():
+                sections.append(current_section)
+            current_section = {"heading": stripped.title(), "content": ""}
+        else:
+            current_section["content"] += stripped + "\n"
+    if current_section["content"].strip():
+        sections.append(current_section)
+    return {"sections": sections, "section_count": len(sections)}
+
+
+def run_legacy(raw: str):
+    cleaned = legacy_clean_text(raw)
+    return cleaned, legacy_detect_structure(cleaned)
+
+
+def run_new(raw: str):
+    preprocessor = StreamingPreprocessor()
+    cleaned = preprocessor.feed(raw)
+    return cleaned, preprocessor.finish()
+
+
+def best_time(fn, raw: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(raw)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def peak_memory(fn, raw: str):
+    tracemalloc.start()
+    cleaned, structure = fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, deep_sizeof(structure), structure["section_count"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = parser.parse_args()
+
+    print(
+        f"{'size':>7} | {'old (s)':>8} | {'new (s)':>8} | {'speedup':>7} | "
+        f"{'old peak MB':>11} | {'new peak MB':>11} | {'old struct MB':>13} | {'new struct KB':>13} | sections"
+    )
+    for size_mb in args.sizes_mb:
+        raw = make_raw_text(int(size_mb * 1024 * 1024))
+        old_s = best_time(run_legacy, raw, args.repeat)
+        new_s = best_time(run_new, raw, args.repeat)
+        old_peak, old_struct, old_sections = peak_memory(run_legacy, raw)
+        new_peak, new_struct, new_sections = peak_memory(run_new, raw)
+        print(
+            f"{size_mb:>5.0f}MB | {old_s:>8.3f} | {new_s:>8.3f} | {old_s / new_s:>6.1f}x | "
+            f"{old_peak / 1e6:>11.1f} | {new_peak / 1e6:>11.1f} | {old_struct / 1e6:>13.2f} | "
+            f"{new_struct / 1e3:>13.1f} | {old_sections}/{new_sections}"
+        )
@@ -0,0 +1,80 @@
+"""
+Synthetic document corpus for load tests: report-like PDF and TXT files of given sizes,
+with ALL CAPS section headings, paragraphs and page numbers.
+
+Usage (from backend/):
+    python benchmarks/corpus.py --out /tmp/corpus --sizes-kb 20 200 1000 --count 5
+"""
+import argparse
+import os
+import random
+from typing import List
+
+import fitz
+
+WORDS = (
+    "the report finds revenue growth across regions while costs remain stable and "
+    "management expects further investment in infrastructure data analysis supply chain "
+    "customers retention pricing margin outlook risk compliance hiring product launch"
+).split()
+
+HEADINGS = ["EXECUTIVE OVERVIEW", "MARKET CONDITIONS", "FINANCIAL RESULTS", "OPERATIONS", "RISKS", "OUTLOOK"]
+
+# Characters of text per PDF page
+PAGE_CHARS = 3000
+
+
+def make_text(size_bytes: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size_bytes:
+        if rng.random() < 0.05:
+            block = rng.choice(HEADINGS)
+        else:
+            block = ". ".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize()
+                for _ in range(rng.randint(2, 5))
+            ) + "."
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts)[:size_bytes]
+
+
+def make_pdf(text: str) -> bytes:
+    doc = fitz.open()
+    for page_number, start in enumerate(range(0, len(text), PAGE_CHARS), start=1):
+        page = doc.new_page()
+        body = text[start:start + PAGE_CHARS] + f"\n\n{page_number}"
+        page.insert_textbox(fitz.Rect(40, 40, 560, 810), body, fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_corpus(out_dir: str, sizes_kb: List[int], count: int, formats: List[str], seed: int = 42) -> List[str]:
+    """Writes count documents per (size, format) and returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for size_kb in sizes_kb:
+        for i in range(count):
+            text = make_text(size_kb * 1024, seed + size_kb * 1000 + i)
+            for fmt in formats:
+                path = os.path.join(out_dir, f"doc_{size_kb}kb_{i}.{fmt}")
+                if not os.path.exists(path):
+                    data = make_pdf(text) if fmt == "pdf" else text.encode("utf-8")
+                    with open(path, "wb") as f:
+                        f.write(data)
+                paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Output directory (existing files are reused)")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[20, 200, 1000])
+    parser.add_argument("--count", type=int, default=5, help="Documents per size and format")
+    parser.add_argument("--formats", nargs="+", choices=["pdf", "txt"], default=["pdf", "txt"])
+    args = parser.parse_args()
+
+    paths = make_corpus(args.out, args.sizes_kb, args.count, args.formats)
+    print(f"{len(paths)} documents in {args.out}")
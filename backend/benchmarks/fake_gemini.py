@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Gemini generateContent / streamGenerateContent endpoints.
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port>/v1beta (any API key works).
+Answers take latency +/- jitter ms, a share of requests get 429 + Retry-After, and packed
+map prompts ("JSON array of exactly N strings") get a JSON array so packing works end to end.
+
+    GET  /stats   -> {"calls", "stream_calls", "rate_limited", "input_chars"}
+    POST /reset   -> zero the counters
+
+Usage (from backend/):
+    python benchmarks/fake_gemini.py --port 8765 --latency-ms 400 --jitter-ms 150 --rate-429 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "the document describes revenue growth stable costs planned investment regional "
+    "results key risks and the recommended next steps for management"
+).split()
+
+_PACKED = re.compile(r"JSON array of exactly (\d+) strings")
+
+
+def create_app(latency_ms: float, jitter_ms: float, rate_429: float, response_words: int, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    rng = random.Random(seed)
+    stats = {"calls": 0, "stream_calls": 0, "rate_limited": 0, "input_chars": 0}
+
+    def answer_text(prompt: str) -> str:
+        def sentence() -> str:
+            return " ".join(rng.choice(WORDS) for _ in range(response_words)).capitalize() + "."
+
+        packed = _PACKED.search(prompt)
+        if packed:
+            return json.dumps([sentence() for _ in range(int(packed.group(1)))])
+        return sentence()
+
+    def candidate(text: str) -> dict:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+    @app.post("/v1beta/models/{target}")
+    async def generate(target: str, request: Request):
+        _, _, action = target.partition(":")
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        stats["calls"] += 1
+        stats["input_chars"] += len(prompt)
+
+        if rng.random() < rate_429:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                headers={"Retry-After": "1"},
+            )
+
+        await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+        text = answer_text(prompt)
+
+        if action == "streamGenerateContent":
+            stats["stream_calls"] += 1
+
+            async def events():
+                words = text.split(" ")
+                for i in range(0, len(words), 8):
+                    yield f"data: {json.dumps(candidate(' '.join(words[i:i + 8]) + ' '))}\r\n\r\n"
+                    await asyncio.sleep(0.005)
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return candidate(text)
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/reset")
+    def reset():
+        for key in stats:
+            stats[key] = 0
+        return stats
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=400, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=150, help="Std deviation of the latency")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--response-words", type=int, default=60, help="Words per answer (per summary when packed)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.jitter_ms, args.rate_429, args.response_words, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,317 @@
+"""
+Load test for /upload and /summarize against a local fake Gemini server (no API key, no network).
+
+Starts benchmarks/fake_gemini.py and the API (uvicorn) as subprocesses, generates a
+synthetic corpus (benchmarks/corpus.py), then runs one stage per endpoint/mode at the
+given concurrency:
+    upload                 every corpus document
+    summarize:<mode>       every uploaded session, once per --modes entry
+
+Per stage: p50/p95/p99 latency, requests/s, errors, LLM calls per request (counted by
+the fake server) and peak RSS of the API process while the stage ran.
+Results are written to --results-dir as JSON; --compare prints the change against an
+earlier result file.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --sizes-kb 20 200 --count 10 --concurrency 8
+    python benchmarks/load_test.py --label packed --compare benchmarks/results/baseline.json
+    python benchmarks/load_test.py --latency-ms 800 --rate-429 0.05 --modes executive query_focused
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.corpus import make_corpus
+
+DEFAULT_RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+DEFAULT_QUERY = "What are the main risks and the recommended next steps?"
+
+# Metrics compared by --compare (lower is better unless listed in HIGHER_IS_BETTER)
+COMPARED_METRICS = ["p50_s", "p95_s", "p99_s", "rps", "llm_calls_per_request", "peak_rss_mb", "errors"]
+HIGHER_IS_BETTER = {"rps"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def wait_until_ready(base_url: str, timeout: float) -> str:
+    """Waits for /ready (embedding model loaded); returns the last reported state."""
+    deadline = time.monotonic() + timeout
+    state = "loading"
+    while time.monotonic() < deadline:
+        response = httpx.get(f"{base_url}/ready", timeout=5)
+        state = response.json()["status"]
+        if state in ("ready", "error"):
+            break
+        time.sleep(0.5)
+    return state
+
+
+class RssSampler:
+    """Samples a process's resident set size (Linux /proc) in a thread; peak_mb is None elsewhere."""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.path = f"/proc/{pid}/status"
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _read_kb(self) -> int:
+        with open(self.path) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+        return 0
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.peak_kb = max(self.peak_kb, self._read_kb())
+            except OSError:
+                return
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        if os.path.exists(self.path):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_kb / 1024, 1) if self.peak_kb else None
+
+
+async def run_stage(
+    name: str,
+    requests: List[Callable[[], Awaitable[None]]],
+    concurrency: int,
+    fake: httpx.AsyncClient,
+    app_pid: int,
+) -> dict:
+    """Runs the requests with at most `concurrency` in flight and returns the stage metrics."""
+    await fake.post("/reset")
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request: Callable[[], Awaitable[None]]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await request()
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e)[:200])
+
+    with RssSampler(app_pid) as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*[one(r) for r in requests])
+        elapsed = time.perf_counter() - started
+
+    llm = (await fake.get("/stats")).json()
+    p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]).round(3).tolist() if latencies else [None] * 3)
+    return {
+        "stage": name,
+        "requests": len(requests),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_s": p50,
+        "p95_s": p95,
+        "p99_s": p99,
+        "llm_calls": llm["calls"],
+        "llm_rate_limited": llm["rate_limited"],
+        "llm_calls_per_request": round(llm["calls"] / len(requests), 2) if requests else 0.0,
+        "peak_rss_mb": rss.peak_mb,
+    }
+
+
+def print_stage(stage: dict) -> None:
+    def fmt(value) -> str:
+        return "-" if value is None else f"{value}"
+
+    print(
+        f"{stage['stage']:<26} | {stage['requests']:>5} | {stage['errors']:>4} | {fmt(stage['p50_s']):>7} | "
+        f"{fmt(stage['p95_s']):>7} | {fmt(stage['p99_s']):>7} | {stage['rps']:>7} | "
+        f"{stage['llm_calls_per_request']:>9} | {fmt(stage['peak_rss_mb']):>8}"
+    )
+
+
+def compare(current: dict, baseline: dict) -> None:
+    print(f"\nChange vs {baseline['label']} ({baseline['timestamp']}):")
+    old_stages = {s["stage"]: s for s in baseline["stages"]}
+    for stage in current["stages"]:
+        old = old_stages.get(stage["stage"])
+        if old is None:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            new_value, old_value = stage.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            if old_value == 0:
+                changes.append(f"{metric} {old_value} -> {new_value}")
+                continue
+            delta = (new_value - old_value) / old_value * 100
+            better = delta > 0 if metric in HIGHER_IS_BETTER else delta < 0
+            mark = "" if abs(delta) < 5 else (" (better)" if better else " (WORSE)")
+            changes.append(f"{metric} {delta:+.0f}%{mark}")
+        print(f"  {stage['stage']:<26} " + ", ".join(changes))
+
+
+async def drive(args, app_url: str, fake_url: str, app_pid: int, paths: List[str]) -> List[dict]:
+    timeout = httpx.Timeout(args.request_timeout)
+    stages = []
+    async with httpx.AsyncClient(base_url=app_url, timeout=timeout) as client, \
+            httpx.AsyncClient(base_url=fake_url, timeout=10) as fake:
+        sessions: List[str] = []
+
+        def upload(path: str) -> Callable[[], Awaitable[None]]:
+            async def request() -> None:
+                with open(path, "rb") as f:
+                    data = f.read()
+                params = {"prefetch": "true"} if args.prefetch else {}
+                response = await client.post("/upload", params=params, files={"file": (os.path.basename(path), data)})
+                response.raise_for_status()
+                sessions.append(response.json()["session_id"])
+            return request
+
+        stages.append(await run_stage("upload", [upload(p) for p in paths], args.concurrency, fake, app_pid))
+
+        for mode in args.modes:
+            def summarize(session_id: str, mode: str = mode) -> Callable[[], Awaitable[None]]:
+                async def request() -> None:
+                    body = {"mode": mode, "query": args.query if mode == "query_focused" else None}
+                    response = await client.post("/summarize", json=body, headers={"x-session-id": session_id})
+                    response.raise_for_status()
+                return request
+
+            stages.append(await run_stage(
+                f"summarize:{mode}", [summarize(s) for s in sessions], args.concurrency, fake, app_pid
+            ))
+    return stages
+
+
+def main(args) -> dict:
+    corpus_dir = args.corpus or os.path.join(tempfile.gettempdir(), "summarizer-load-corpus")
+    paths = make_corpus(corpus_dir, args.sizes_kb, args.count, args.formats)
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url, app_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{app_port}"
+    app_env = dict(
+        os.environ,
+        GEMINI_BASE_URL=f"{fake_url}/v1beta",
+        GEMINI_API_KEY="load-test",
+        LLM_PROVIDERS="gemini",
+        LLM_CACHE_ENABLED="true" if args.cache else "false",
+        JOBS_DIR=tempfile.mkdtemp(prefix="load-test-jobs-"),
+    )
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        app_env[key] = value
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_gemini.py"), "--port", str(fake_port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--rate-429", str(args.rate_429), "--response-words", str(args.response_words),
+        ], cwd=BACKEND_DIR))
+        app = subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+            "--log-level", "warning",
+        ], cwd=BACKEND_DIR, env=app_env)
+        processes.append(app)
+
+        wait_until_up(f"{fake_url}/stats")
+        wait_until_up(f"{app_url}/health")
+        ready = wait_until_ready(app_url, args.ready_timeout)
+        print(f"{len(paths)} documents, concurrency {args.concurrency}, embedding model: {ready}")
+
+        stages = asyncio.run(drive(args, app_url, fake_url, app.pid, paths))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    print(f"\n{'stage':<26} | {'reqs':>5} | {'errs':>4} | {'p50 s':>7} | {'p95 s':>7} | {'p99 s':>7} | "
+          f"{'req/s':>7} | {'LLM/req':>9} | {'RSS MB':>8}")
+    for stage in stages:
+        print_stage(stage)
+
+    return {
+        "label": args.label,
+        "timestamp": time.strftime("%Y%m%d-%H%M%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "results_dir")},
+        "stages": stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--label", default="run", help="Name stored with the results")
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[20, 200])
+    parser.add_argument("--count", type=int, default=5, help="Documents per size and format")
+    parser.add_argument("--formats", nargs="+", choices=["pdf", "txt"], default=["pdf", "txt"])
+    parser.add_argument("--corpus", help="Corpus directory (default: a reusable temp dir)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--modes", nargs="+", default=["executive"])
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="Query for query_focused")
+    parser.add_argument("--prefetch", action="store_true", help="Upload with prefetch=true")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--jitter-ms", type=float, default=150)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--response-words", type=int, default=60)
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--ready-timeout", type=float, default=120, help="Max wait for the embedding model")
+    parser.add_argument("--app-env", nargs="*", default=[], metavar="KEY=VALUE", help="Extra env for the API process")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    result = main(args)
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f"{result['timestamp']}-{args.label}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
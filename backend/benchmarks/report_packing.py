@@ -0,0 +1,113 @@
+"""
+Prompt packing report: LLM calls and tokens per document, before vs after the planner.
+
+Runs the real ingest + summarization pipeline against a mocked LLM endpoint (no network,
+no API key) and counts every request:
+- before: fixed 2000-token chunks, one map call per chunk, map phase above 5 chunks
+- after:  planner.plan_for_model(model) budgets, packed map calls, single call when the
+          document fits one prompt
+
+Usage (from backend/):
+    python benchmarks/report_packing.py                            # configured model
+    python benchmarks/report_packing.py --models gpt-4o-mini gemini-3-flash-preview --sizes-k 8 50 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline, unthrottled runs: no response cache, no rate-limit waits
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000")
+os.environ.setdefault("LLM_PROVIDERS", "gemini")  # the mock answers in Gemini's format
+
+import httpx
+from config import MODEL_NAME
+from services import http_client
+from services.chunker import get_token_count
+from services.ingest import ingest_text_async
+from services.planner import model_plan, plan_for_model, needs_map_phase
+from services.summarizer import hierarchical_summarize_async, summarize_async
+
+WORDS = (
+    "the report finds revenue growth across regions while costs remain stable and "
+    "management expects further investment in infrastructure data analysis supply chain"
+).split()
+
+# What the plan looked like before the planner
+BEFORE_PLAN = {"prompt_budget": 10000, "chunk_size": 2000, "chunk_overlap": 200, "reduce_budget": 6000, "max_chunks_per_call": 1}
+
+SUMMARY = "The segment reports steady revenue growth, flat costs and planned infrastructure investment. " * 2
+
+
+def make_text(target_tokens: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    paragraphs, tokens = [], 0
+    while tokens < target_tokens:
+        paragraph = ". ".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))) for _ in range(4)) + "."
+        paragraphs.append(paragraph)
+        tokens += get_token_count(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+class Meter:
+    """Mock Gemini endpoint that records calls and tokens."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["contents"][0]["parts"][0]["text"]
+        packed = re.search(r"JSON array of exactly (\d+) strings", prompt)
+        text = json.dumps([SUMMARY] * int(packed.group(1))) if packed else SUMMARY
+        self.calls += 1
+        self.input_tokens += get_token_count(prompt)
+        self.output_tokens += get_token_count(text)
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+
+async def run_document(text: str, plan: dict) -> dict:
+    model_plan.update(plan)  # shared by ingest and summarizer
+    meter = Meter()
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(meter.handler))
+    ingested = await ingest_text_async(text, {"title": "report"})
+    chunks = ingested["chunks"]
+    if len(chunks) > 1 and needs_map_phase(ingested["total_tokens"], plan):
+        await hierarchical_summarize_async(chunks, "executive")
+    else:
+        await summarize_async("executive", chunks)
+    await http_client._client.aclose()
+    return {"chunks": len(chunks), "calls": meter.calls, "input": meter.input_tokens, "output": meter.output_tokens}
+
+
+async def main(models, sizes_k):
+    original = dict(model_plan)
+    print(f"{'model':<24} | {'doc':>6} | {'chunks':>11} | {'calls':>11} | {'input tok':>17} | {'output tok':>15}")
+    for model in models:
+        after_plan = plan_for_model(model)
+        for size_k in sizes_k:
+            text = make_text(size_k * 1000)
+            before = await run_document(text, {**original, **BEFORE_PLAN})
+            after = await run_document(text, after_plan)
+            print(
+                f"{model:<24} | {size_k:>5}k | {before['chunks']:>5} -> {after['chunks']:<3} | "
+                f"{before['calls']:>5} -> {after['calls']:<3} | "
+                f"{before['input']:>7} -> {after['input']:<7} | {before['output']:>6} -> {after['output']:<6}"
+            )
+    model_plan.update(original)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=[MODEL_NAME])
+    parser.add_argument("--sizes-k", type=int, nargs="+", default=[8, 30, 100, 400], help="Document sizes in k tokens")
+    args = parser.parse_args()
+    asyncio.run(main(args.models, args.sizes_k))
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,4 +11,140 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 USE_GEMINI = bool(GEMINI_API_KEY)
 USE_OPENAI = bool(OPENAI_API_KEY) and not USE_GEMINI
 
-MODEL_NAME = "gemini-1.5-flash" if USE_GEMINI else ("gpt-4o-mini" if USE_OPENAI else "llama-3.1-8b-instant")
+# Gemini REST endpoint (point at a local stand-in for load tests, see benchmarks/fake_gemini.py)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+# Any OpenAI-compatible /chat/completions API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Llama fallback: a local OpenAI-compatible server (Ollama, llama.cpp, vLLM), no API key
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:11434/v1").rstrip("/")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "llama-3.1-8b-instant")
+
+# Backends in priority order, e.g. LLM_PROVIDERS=gemini,openai: the first serves every call,
+# the others are hedge and failover targets. Opt-in: by default only the highest-priority
+# backend with an API key (Gemini > OpenAI, else local) ever receives document text.
+_DEFAULT_PROVIDER = "gemini" if GEMINI_API_KEY else "openai" if OPENAI_API_KEY else "local"
+LLM_PROVIDERS = [name.strip() for name in os.getenv("LLM_PROVIDERS", _DEFAULT_PROVIDER).split(",") if name.strip()]
+
+# Model of the primary backend (prompt budgets and cache keys follow it)
+MODEL_NAME = {"gemini": GEMINI_MODEL, "openai": OPENAI_MODEL, "local": LOCAL_LLM_MODEL}.get(LLM_PROVIDERS[0], GEMINI_MODEL)
+
+# ─── LLM HTTP client (shared connection pool) ───────────
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+
+# ─── LLM scheduler (rate limits, adaptive concurrency, retries) ─
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "1000"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "2"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+
+# ─── LLM providers: hedged requests and failover ────────
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))       # hedge calls slower than this latency quantile
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))      # seconds; never hedge sooner
+LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "30"))       # ...nor later (also used until latencies are known)
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))     # latencies needed before the quantile is trusted
+# With a single backend, hedge with a second request to the same one (another replica behind its load balancer)
+LLM_HEDGE_SAME_PROVIDER = os.getenv("LLM_HEDGE_SAME_PROVIDER", "true").lower() == "true"
+LLM_PROVIDER_MAX_FAILURES = int(os.getenv("LLM_PROVIDER_MAX_FAILURES", "3"))  # consecutive failures before a backend...
+LLM_PROVIDER_COOLDOWN = float(os.getenv("LLM_PROVIDER_COOLDOWN", "30"))       # ...is skipped for this many seconds
+
+# ─── LLM response cache (memory LRU + SQLite on disk) ───
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite3")
+)
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "2048"))
+LLM_CACHE_DISK_MAX_MB = float(os.getenv("LLM_CACHE_DISK_MAX_MB", "256"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# ─── Hierarchical summarization (tree reduce) ───────────
+REDUCE_TOKEN_BUDGET = int(os.getenv("REDUCE_TOKEN_BUDGET", "6000"))  # max tokens sent to one reduce/final call
+REDUCE_FAN_IN = int(os.getenv("REDUCE_FAN_IN", "8"))                # max summaries merged per reduce call
+REDUCE_MAX_DEPTH = int(os.getenv("REDUCE_MAX_DEPTH", "4"))           # safety cap on reduce levels
+
+# ─── Streaming ingestion ────────────────────────────────
+INGEST_PAGE_QUEUE_SIZE = int(os.getenv("INGEST_PAGE_QUEUE_SIZE", "8"))  # pages buffered between parser thread and pipeline
+# Start map-phase summaries while later pages are still being parsed (costs LLM calls at upload time)
+INGEST_PREFETCH_SUMMARIES = os.getenv("INGEST_PREFETCH_SUMMARIES", "false").lower() == "true"
+
+# ─── PDF extraction ─────────────────────────────────────
+PDF_PROCESS_WORKERS = int(os.getenv("PDF_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 disables the process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "200"))  # smaller PDFs stay on the in-thread path
+
+# ─── Document session store ─────────────────────────────
+SESSION_MAX_MB = float(os.getenv("SESSION_MAX_MB", "512"))                     # total bytes held by all sessions
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))  # drop sessions idle this long
+
+# ─── Coherence embedding model ──────────────────────────
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+# Load the model in the background at startup (otherwise on the first coherence check)
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))            # flush when this many texts are queued
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "10"))    # ...or when the oldest waited this long
+EMBED_CACHE_ENTRIES = int(os.getenv("EMBED_CACHE_ENTRIES", "10000"))   # LRU of vectors keyed by text hash
+
+# ─── Retrieval (query_focused mode) ─────────────────────
+# Chunk embeddings are built at upload; a query sends only the best-matching chunks to the LLM
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6"))          # chunks picked by similarity to the query
+RETRIEVAL_NEIGHBORS = int(os.getenv("RETRIEVAL_NEIGHBORS", "1"))  # adjacent chunks added on each side of a hit
+# The embedding model reads ~256 word pieces, so chunks are indexed as overlapping word windows
+RETRIEVAL_WINDOW_WORDS = int(os.getenv("RETRIEVAL_WINDOW_WORDS", "150"))
+RETRIEVAL_WINDOW_OVERLAP_WORDS = int(os.getenv("RETRIEVAL_WINDOW_OVERLAP_WORDS", "30"))
+
+# ─── Background jobs (/jobs) ────────────────────────────
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs"))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))                  # jobs processed concurrently
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "10000"))        # submissions beyond this get 429
+JOBS_MAX_ZIP_MB = float(os.getenv("JOBS_MAX_ZIP_MB", "200"))        # max size of one uploaded zip archive
+JOBS_MAX_ZIP_MEMBERS = int(os.getenv("JOBS_MAX_ZIP_MEMBERS", "1000"))  # files queued from one zip; the rest are rejected
+JOBS_MAX_UNZIPPED_MB = float(os.getenv("JOBS_MAX_UNZIPPED_MB", "1000"))  # decompressed bytes per request, all zips together
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 3600)))  # finished jobs kept this long
+
+# ─── Near-duplicate chunks (map phase) ─────────────────
+# Chunks that repeat (boilerplate, appendices, re-exported slides) are summarized once
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))    # estimated Jaccard similarity of word 5-grams
+DEDUP_SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))        # MinHash signature length
+
+# ─── Extractive compression (local, no LLM) ───────────
+EXTRACTIVE_PREFILTER = os.getenv("EXTRACTIVE_PREFILTER", "false").lower() == "true"  # shrink chunks before map prompts
+EXTRACTIVE_PREFILTER_RATIO = float(os.getenv("EXTRACTIVE_PREFILTER_RATIO", "0.5"))   # share of a chunk's text kept
+EXTRACTIVE_SUMMARY_SENTENCES = int(os.getenv("EXTRACTIVE_SUMMARY_SENTENCES", "10"))  # "extractive" mode output
+EXTRACTIVE_DIVERSITY = float(os.getenv("EXTRACTIVE_DIVERSITY", "0.3"))               # MMR: 0 = top-ranked only
+
+# ─── Section-wise mode ──────────────────────────────────
+SECTION_CHUNK_TOKENS = int(os.getenv("SECTION_CHUNK_TOKENS", "2000"))  # larger sections are sub-chunked, mapped and merged
+
+# ─── Prompt packing planner ─────────────────────────────
+# Context window and max output tokens per model; extend/override with
+# MODEL_LIMITS='{"model-name": {"context": 128000, "output": 16384}}'
+MODEL_LIMITS = {
+    "gemini-1.5-flash": {"context": 1048576, "output": 8192},
+    "gemini-3-flash-preview": {"context": 1048576, "output": 65536},
+    "gpt-4o-mini": {"context": 128000, "output": 16384},
+    "llama-3.1-8b-instant": {"context": 131072, "output": 8192},
+}
+MODEL_LIMITS.update(json.loads(os.getenv("MODEL_LIMITS", "{}")))
+PACK_PROMPT_TOKENS = int(os.getenv("PACK_PROMPT_TOKENS", "32000"))            # target input tokens per packed call
+PACK_MAX_CHUNKS_PER_CALL = int(os.getenv("PACK_MAX_CHUNKS_PER_CALL", "8"))    # chunks summarized by one map call
+CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", "2000"))               # upper bound; small models get less
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "200"))
+CHUNK_CONTENT_DEFINED = os.getenv("CHUNK_CONTENT_DEFINED", "true").lower() == "true"  # edits shift few chunk boundaries
+
+# ─── Telemetry ──────────────────────────────────────────
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # /metrics endpoint + request metrics
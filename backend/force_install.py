@@ -7,8 +7,6 @@ packages = [
     "uvicorn",
     "python-multipart",
     "pymupdf",
-    "langchain",
-    "langchain-community",
     "openai",
     "sentence-transformers",
     "python-dotenv",
@@ -34,8 +32,8 @@ def install():
             
             f.write("\nVerification:\n")
             # Verify import
-            import langchain
-            f.write(f"LangChain imported successfully.\n")
+            import tiktoken
+            f.write(f"tiktoken imported successfully.\n")
             f.write("ALL INSTALLED SUCCESSFULLY.\n")
             print("Installation SUCCESS.")
         except Exception as e:
@@ -1,16 +1,82 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Header
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Union, Any
+from typing import Optional, List, Dict, Union, Any, Callable, Tuple
 import uuid
-from services.pdf_parser import extract_text_from_pdf_async
-from services.preprocessor import clean_text, detect_structure
-from services.chunker import chunk_document, get_token_count
-from services.summarizer import summarize_async, hierarchical_summarize_async, call_llm_async
-from services.coherence import check_coherence
+from services.ingest import ingest_pdf_async, ingest_text_async
+from services.pdf_parser import shutdown_process_pool
+from services.session_store import SessionStore
+from services.planner import needs_map_phase
+from services.chunker import get_token_count, chunk_hash
+from services.summarizer import (
+    summarize_async,
+    hierarchical_summarize_async,
+    reduce_chunks_async,
+    final_summarize_async,
+    section_wise_summarize_async,
+    MapPrefetcher,
+    build_prompt_messages,
+    stream_llm_async,
+)
+from services.coherence import check_coherence_async
+from services.retrieval import build_chunk_index, retrieve_chunk_indices, take_chunks
+from services.embeddings import warm_up_model, get_model_status, embedding_batcher
+from services.http_client import get_http_client, close_http_client, get_client_stats
+from services.rate_limiter import llm_scheduler, current_session
+from services.providers import llm_router
+from services.llm_cache import llm_cache
+from services.jobs import job_queue, QueueFullError, TERMINAL_STATUSES
+from services.telemetry import metrics, MetricsMiddleware, current_mode, start_trace, span, failures
+from config import (
+    INGEST_PREFETCH_SUMMARIES,
+    SESSION_MAX_MB,
+    SESSION_IDLE_TTL_SECONDS,
+    EMBEDDING_WARMUP,
+    RETRIEVAL_ENABLED,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_NEIGHBORS,
+    JOBS_MAX_ZIP_MB,
+    JOBS_MAX_ZIP_MEMBERS,
+    JOBS_MAX_UNZIPPED_MB,
+    LOG_LEVEL,
+    METRICS_ENABLED,
+)
+from contextlib import asynccontextmanager
 import asyncio
+import json
+import logging
+import zipfile
+
+# Service failures are logged (and counted in /metrics) instead of printed
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per LLM request otherwise
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared LLM connection pool once; every call reuses it
+    get_http_client()
+    # Load the embedding model in the background: the app serves /health immediately,
+    # /ready reports when coherence checks can run without a cold start
+    if EMBEDDING_WARMUP:
+        # Keep a reference so the task isn't garbage-collected; failures are reported by /ready
+        app.state.embedding_warmup = asyncio.create_task(asyncio.to_thread(warm_up_model))
+        app.state.embedding_warmup.add_done_callback(lambda t: t.cancelled() or t.exception())
+    # Background job workers (queued and interrupted jobs from the last run resume here)
+    job_queue.start(run_job)
+    yield
+    # Running jobs stay queued and resume on the next start
+    await job_queue.stop()
+    # Clean shutdown: close pooled keep-alive connections
+    await close_http_client()
+    shutdown_process_pool()
+    if llm_cache is not None:
+        llm_cache.close()
+
 
-app = FastAPI(title="Smart Document Summarizer API")
+app = FastAPI(title="Smart Document Summarizer API", lifespan=lifespan)
 
 # Allow frontend (running on different port) to call this API
 app.add_middleware(
@@ -21,32 +87,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency per route and requests in flight, exported on /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 # ─── Data Models ─────────────────────────────────────────
 class SummarizeRequest(BaseModel):
-    mode: str                    # "executive", "detailed", "bullet_points", "section_wise", "query_focused"
+    mode: str                    # "executive", "detailed", "bullet_points", "section_wise", "query_focused", "extractive"
     query: Optional[str] = None     # Only used for query_focused mode
 
 
+class BatchSummarizeRequest(BaseModel):
+    requests: List[SummarizeRequest]  # several modes (and queries) over the same upload
+
+
+# File size limit for one zip submitted to /jobs
+MAX_ZIP_SIZE = int(JOBS_MAX_ZIP_MB * 1024 * 1024)
+MAX_UNZIPPED_SIZE = int(JOBS_MAX_UNZIPPED_MB * 1024 * 1024)
+
+
 # ─── Session-based storage for concurrent users ─────────
 # Each session ID maps to its own document data
 # This allows multiple users to upload/summarize simultaneously
-document_sessions = {}  # {session_id: document_data}
+def _on_session_evicted(session_id: str, doc: dict):
+    # Stop prefetch work for documents nobody can summarize anymore
+    cancel_prefetch(doc.get("map_prefetch", []))
+
+
+# Bounded by bytes (LRU eviction) and idle time, instead of growing forever
+document_sessions = SessionStore(
+    max_bytes=int(SESSION_MAX_MB * 1024 * 1024),
+    idle_ttl=SESSION_IDLE_TTL_SECONDS,
+    on_evict=_on_session_evicted,
+)
+
+# Stats the services already keep, exported on /metrics (keys of each .stats dict are counters)
+metrics.register_collector("llm_client", get_client_stats, counters=["requests"])
+metrics.register_collector("llm_scheduler", llm_scheduler.get_stats, counters=llm_scheduler.stats)
+metrics.register_collector("llm_router", llm_router.get_stats, counters=llm_router.stats)
+if llm_cache is not None:
+    metrics.register_collector("llm_cache", llm_cache.get_stats, counters=llm_cache.stats)
+metrics.register_collector("sessions", document_sessions.get_stats, counters=document_sessions.stats)
+metrics.register_collector("embeddings", embedding_batcher.get_stats, counters=embedding_batcher.stats)
+metrics.register_collector("jobs", job_queue.get_stats, counters=job_queue.stats)
 
 # File size limit (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# Modes that don't run on the shared map phase and skip the coherence check
+STANDALONE_MODES = ("section_wise", "extractive")
+
 
 # ─── ROUTE 1: Upload & Preprocess ────────────────────────
 @app.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
-    x_session_id: Optional[str] = Header(None)
+    x_session_id: Optional[str] = Header(None),
+    prefetch: Optional[bool] = Query(None),
 ):
     """
     Receives a PDF or TXT file with session management.
-    Extracts text, cleans it, detects structure, chunks it.
+    Extracts text, cleans it, detects structure, chunks it — page by page.
+    With prefetch=true, map-phase summaries start as soon as each chunk is final.
     Stores in session-specific storage for concurrent user support.
+    Re-uploading to the same session keeps the map summaries of unchanged chunks (matched
+    by content hash), so only new or edited chunks go to the LLM; "diff" reports the match.
     Returns session ID and metadata.
     """
     # Validate file size first
@@ -61,115 +169,747 @@ async def upload_document(
     session_id = x_session_id or str(uuid.uuid4())
     filename = file.filename
 
-    # Handle PDF vs plain text
-    if filename.endswith(".pdf"):
-        parsed = await extract_text_from_pdf_async(file_bytes)
-        raw_text = parsed["full_text"]
-        metadata = parsed["metadata"]
-    elif filename.endswith(".txt"):
-        raw_text = file_bytes.decode("utf-8")
-        metadata = {"title": filename, "author": "Unknown", "page_count": 1}
-    else:
+    # Previous version of the document in this session: its chunk summaries carry over by hash
+    previous = document_sessions.get(session_id) if x_session_id else None
+    known_by_hash = stored_chunk_summaries(previous) if previous else {}
+    running_by_hash = running_prefetch(previous) if previous else {}
+    reused_tasks = set()
+
+    # Optionally start map-phase summaries while later pages are still being parsed,
+    # packed into the same multi-chunk calls as the map phase
+    prefetch_tasks = []
+    on_chunk = None
+    prefetcher = MapPrefetcher()
+    use_prefetch = INGEST_PREFETCH_SUMMARIES if prefetch is None else prefetch
+    if use_prefetch:
+        current_session.set(session_id)
+        current_mode.set("prefetch")
+        started_by_hash: Dict[str, asyncio.Future] = {}
+
+        def on_chunk(index: int, text: str, token_count: int):
+            key = chunk_hash(text)
+            if key in known_by_hash:
+                # Unchanged chunk: its summary is already known
+                task = asyncio.get_running_loop().create_future()
+                task.set_result(known_by_hash[key])
+            elif key in running_by_hash:
+                # Unchanged chunk still being prefetched for the previous version: keep waiting on it
+                task = running_by_hash[key]
+                reused_tasks.add(task)
+            elif key in started_by_hash:
+                task = started_by_hash[key]  # repeated chunk in this document
+            else:
+                task = started_by_hash[key] = prefetcher.add(text, token_count)
+            prefetch_tasks.append(task)
+
+    # Handle PDF vs plain text (page-streaming pipeline: parse -> clean -> chunk)
+    if not filename.endswith(SUPPORTED_EXTENSIONS):
         raise HTTPException(status_code=400, detail="Only PDF and TXT files are supported.")
+    try:
+        ingested = await ingest_file(filename, file_bytes, on_chunk)
+    except BaseException:
+        # The previous version stays in the session, together with its own prefetch
+        cancel_prefetch([task for task in prefetch_tasks if task not in reused_tasks])
+        raise
+
+    metadata = ingested["metadata"]
+    cleaned_text = ingested["cleaned_text"]
+    structure = ingested["structure"]
+    chunks = ingested["chunks"]
+    chunk_hashes = ingested["chunk_hashes"]
 
-    # Clean the text
-    cleaned_text = clean_text(raw_text)
+    # Documents that fit one prompt skip the map phase, so prefetched summaries would be wasted
+    if not needs_map_phase(ingested["total_tokens"]):
+        cancel_prefetch(prefetch_tasks)
+        prefetch_tasks = []
+    prefetcher.finish()  # sends the last, partial group
 
-    # Detect document structure (sections/headings)
-    structure = detect_structure(cleaned_text)
+    # Embed chunks once so query_focused requests only send the relevant ones
+    with span("index"):
+        chunk_index = await index_chunks(chunks)
 
-    # Chunk the document
-    chunks = chunk_document(cleaned_text)
+    diff = None
+    if previous is not None:
+        # Replacing the previous version cancels its prefetch, except the tasks taken over above
+        previous["map_prefetch"] = [task for task in previous.get("map_prefetch", []) if task not in reused_tasks]
+        previous_hashes = set(previous.get("chunk_hashes", []))
+        current_hashes = set(chunk_hashes)
+        unchanged = sum(1 for key in chunk_hashes if key in previous_hashes)
+        diff = {
+            "previous_chunks": len(previous.get("chunk_hashes", [])),
+            "unchanged": unchanged,
+            "added": len(chunk_hashes) - unchanged,
+            "removed": len(previous_hashes - current_hashes),
+            "reused_summaries": sum(1 for key in chunk_hashes if key in known_by_hash or key in running_by_hash),
+        }
 
-    # Store in session-specific slot
-    document_sessions[session_id] = {
+    # Store in session-specific slot (a re-upload replaces the old document and cancels its prefetch)
+    document_sessions.put(session_id, {
         "metadata": metadata,
         "cleaned_text": cleaned_text,
         "structure": structure,
         "chunks": chunks,
-        "token_count": get_token_count(cleaned_text),
-    }
+        "chunk_hashes": chunk_hashes,
+        "token_count": ingested["total_tokens"],
+        "map_prefetch": prefetch_tasks,
+        # Map summaries by chunk hash, kept for the next upload to this session
+        "summaries_by_hash": {key: known_by_hash[key] for key in chunk_hashes if key in known_by_hash},
+        "chunk_index": chunk_index,  # window vectors + their chunk ids (see build_chunk_index); None if not built
+    })
 
     # Return session ID and info to the frontend
     return {
         "status": "success",
         "session_id": session_id,  # Frontend must save this
         "metadata": metadata,
-        "token_count": document_sessions[session_id]["token_count"],
+        "token_count": ingested["total_tokens"],
         "chunk_count": len(chunks),
         "section_count": structure["section_count"],
         "preview": cleaned_text[:500] + "..." if len(cleaned_text) > 500 else cleaned_text,
+        "diff": diff,  # None unless this upload replaced a document in the same session
+    }
+
+
+# ─── Helpers ─────────────────────────────────────────────
+async def ingest_file(filename: str, file_bytes: bytes, on_chunk=None) -> dict:
+    """Parse -> clean -> chunk for a PDF or TXT file (extension already validated)."""
+    if filename.endswith(".pdf"):
+        return await ingest_pdf_async(file_bytes, on_chunk)
+    metadata = {"title": filename, "author": "Unknown", "page_count": 1}
+    return await ingest_text_async(file_bytes.decode("utf-8"), metadata, on_chunk)
+
+
+async def index_chunks(chunks: List[str]):
+    """Retrieval index for the chunks, or None (disabled, too few chunks, or embedding failed)."""
+    if not RETRIEVAL_ENABLED or len(chunks) <= RETRIEVAL_TOP_K:
+        return None
+    try:
+        return await build_chunk_index(chunks)
+    except Exception as e:
+        # Retrieval is an optimization: without an index, queries use every chunk
+        failures.inc(kind="chunk_index")
+        logger.warning("Chunk index failed: %s", e)
+        return None
+
+
+def get_session_or_404(session_id: str) -> dict:
+    # Validate session exists (expired or evicted sessions are gone too)
+    doc = document_sessions.get(session_id)
+    if doc is None:
+        raise HTTPException(
+            status_code=404, 
+            detail="Session not found. Please upload a document first."
+        )
+    return doc
+
+
+def use_map_phase(doc: dict, chunks: List[str]) -> bool:
+    """Hierarchical (map-reduce) summarization only when the chunks don't fit one prompt for the model."""
+    if chunks is doc["chunks"]:
+        total_tokens = doc["token_count"]
+    else:
+        total_tokens = sum(get_token_count(chunk) for chunk in chunks)  # retrieved subset: a few chunks
+    return len(chunks) > 1 and needs_map_phase(total_tokens)
+
+
+def cancel_prefetch(tasks: List[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+
+
+def _hashes_for(doc: dict, chunks: List[str]) -> List[str]:
+    return doc["chunk_hashes"] if chunks is doc["chunks"] else [chunk_hash(chunk) for chunk in chunks]
+
+
+def stored_chunk_summaries(doc: dict) -> Dict[str, str]:
+    """Map summaries of a session's document by chunk hash: kept ones plus finished prefetches."""
+    known = dict(doc.get("summaries_by_hash") or {})
+    for key, task in zip(doc.get("chunk_hashes", []), doc.get("map_prefetch", [])):
+        if task.done() and not task.cancelled() and task.exception() is None and task.result():
+            known.setdefault(key, task.result())
+    return known
+
+
+def running_prefetch(doc: dict) -> Dict[str, asyncio.Future]:
+    """Prefetch tasks of a session's document that are still running, by chunk hash."""
+    return {
+        key: task
+        for key, task in zip(doc.get("chunk_hashes", []), doc.get("map_prefetch", []))
+        if not task.done()
     }
 
 
+async def collect_known_summaries(doc: dict, chunks: List[str]) -> Optional[List[Optional[str]]]:
+    """
+    Map summaries already available for chunks: prefetched at upload, or kept from an
+    earlier upload of the document (by chunk hash). None where unknown; None if none is known.
+    """
+    known = [None] * len(chunks)
+    tasks = doc.get("map_prefetch")
+    # Prefetch covers the whole document; a retrieved subset isn't aligned with it
+    if tasks and chunks is doc["chunks"]:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        known = [r if isinstance(r, str) else None for r in results]
+    stored = doc.get("summaries_by_hash")
+    if stored:
+        known = [summary or stored.get(key) for summary, key in zip(known, _hashes_for(doc, chunks))]
+    return known if any(known) else None
+
+
+def remember_chunk_summaries(session_id: Optional[str], doc: dict, chunks: List[str], summaries: List[Optional[str]]) -> None:
+    """Keeps map summaries by chunk hash, so a re-upload only maps the chunks that changed."""
+    stored = doc.get("summaries_by_hash")
+    if stored is None or session_id is None:
+        return  # job documents aren't kept
+    added = False
+    for key, summary in zip(_hashes_for(doc, chunks), summaries):
+        if summary and key not in stored:
+            stored[key] = summary
+            added = True
+    if added:
+        document_sessions.refresh(session_id)
+
+
+async def run_coherence_check(texts: List[Optional[str]], mode: Optional[str] = None) -> Optional[dict]:
+    """
+    Coherence check over the given texts: the map-phase chunk summaries for long
+    documents (no extra LLM calls), the raw chunks for short ones. None if not applicable
+    or if the embedding model is unavailable.
+    """
+    texts = [t for t in texts if t]
+    if len(texts) <= 1 or mode in STANDALONE_MODES:
+        return None
+
+    try:
+        # Embedding runs off the event loop, batched across requests
+        return await check_coherence_async(texts)
+    except Exception as e:
+        # The summary is already paid for: return it without the check rather than failing
+        failures.inc(kind="coherence")
+        logger.warning("Coherence check failed: %s", e)
+        return None
+
+
+async def select_query_indices(doc: dict, query: Optional[str]) -> List[int]:
+    """query_focused input: indices of the top-k chunks for the query (plus neighbours), in document order."""
+    try:
+        with span("retrieval"):
+            return await retrieve_chunk_indices(
+                doc.get("chunk_index"), query, len(doc["chunks"]), RETRIEVAL_TOP_K, RETRIEVAL_NEIGHBORS
+            )
+    except Exception as e:
+        failures.inc(kind="retrieval")
+        logger.warning("Retrieval failed, using all chunks: %s", e)
+        return list(range(len(doc["chunks"])))
+
+
+async def select_query_chunks(doc: dict, query: Optional[str]) -> List[str]:
+    """Retrieved chunks for a query; the session's own list when nothing is filtered out."""
+    return take_chunks(doc["chunks"], await select_query_indices(doc, query))
+
+
+async def summarize_modes(doc: dict, items: List[SummarizeRequest], session_id: Optional[str] = None) -> dict:
+    """
+    Several modes/queries over one document, sharing the map phase (see /summarize/batch).
+    session_id: the session holding doc, if any (its map summaries are kept for re-uploads).
+    Returns {"results": one entry per item, "coherence": ...}; raises if the shared map fails.
+    """
+    chunks = doc["chunks"]
+    sections = doc["structure"]["sections"]
+    use_hierarchical = use_map_phase(doc, chunks)
+
+    # Shared, mode-independent map + reduce, only when a mode reads the whole document
+    # (section_wise runs per section, extractive needs no LLM, query_focused maps its retrieved chunks)
+    current_mode.set("batch")
+    shared = None
+    if use_hierarchical and any(item.mode not in STANDALONE_MODES and item.mode != "query_focused" for item in items):
+        known = await collect_known_summaries(doc, chunks)
+        shared = await reduce_chunks_async(chunks, known_summaries=known)
+        remember_chunk_summaries(session_id, doc, chunks, shared["chunk_summaries"])
+
+    async def run_one(item: SummarizeRequest) -> dict:
+        current_mode.set(item.mode)  # each item runs as its own task
+        failed_chunks = shared["failed_chunks"] if shared else []
+        if item.mode == "section_wise":
+            result = await section_wise_summarize_async(doc["cleaned_text"], sections)
+            return {"summary": result["summary"], "failed_sections": result["failed_sections"]}
+        if item.mode == "extractive":
+            return {"summary": await summarize_async(item.mode, chunks), "failed_chunks": []}
+        if item.mode == "query_focused":
+            indices = await select_query_indices(doc, item.query)
+            subset = take_chunks(chunks, indices)
+            if not use_map_phase(doc, subset):
+                return {"summary": await summarize_async(item.mode, subset, sections, item.query), "failed_chunks": []}
+            if shared is None or subset is not chunks:
+                if shared is not None:
+                    # Map phase already done for these chunks: only reduce + final run here
+                    known = [shared["chunk_summaries"][i] for i in indices]
+                else:
+                    known = await collect_known_summaries(doc, subset)
+                result = await hierarchical_summarize_async(subset, item.mode, sections, item.query, known)
+                if shared is None:
+                    remember_chunk_summaries(session_id, doc, subset, result["chunk_summaries"])
+                return {"summary": result["summary"], "failed_chunks": [indices[i] for i in result["failed_chunks"]]}
+
+        if shared is not None:
+            result = await final_summarize_async(shared, item.mode, sections, item.query)
+            return {"summary": result["summary"], "failed_chunks": failed_chunks}
+        return {"summary": await summarize_async(item.mode, chunks, sections, item.query), "failed_chunks": []}
+
+    outcomes = await asyncio.gather(*[run_one(item) for item in items], return_exceptions=True)
+
+    results = []
+    for item, outcome in zip(items, outcomes):
+        entry = {"mode": item.mode, "query": item.query}
+        if isinstance(outcome, Exception):
+            entry.update({"status": "error", "detail": str(outcome)})
+        else:
+            entry.update({"status": "success", **outcome})
+        results.append(entry)
+
+    # Coherence doesn't depend on the mode: one check over the shared summaries (or raw chunks)
+    coherence_info = None
+    if any(item.mode not in STANDALONE_MODES for item in items):
+        coherence_info = await run_coherence_check(shared["chunk_summaries"] if shared else chunks)
+
+    return {"results": results, "coherence": coherence_info}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_progress(task: asyncio.Task, progress: asyncio.Queue):
+    """Yields progress items until the task has finished and the queue is drained."""
+    try:
+        while not (task.done() and progress.empty()):
+            getter = asyncio.create_task(progress.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                continue
+            yield getter.result()
+    finally:
+        task.cancel()  # no-op once finished; stops work if the client disconnects
+
+
 # ─── ROUTE 2: Generate Summary ───────────────────────────
 @app.post("/summarize")
 async def generate_summary(
     request: SummarizeRequest,
-    x_session_id: str = Header(...)
+    x_session_id: str = Header(...),
+    timings: bool = Query(False),
 ):
     """
     Generates summary using session-validated document data.
     Requires session ID from upload response.
+    With timings=true the response includes the time spent per stage and the LLM calls/tokens used.
     """
-    # Validate session exists
-    if x_session_id not in document_sessions:
-        raise HTTPException(
-            status_code=404, 
-            detail="Session not found. Please upload a document first."
-        )
-    
-    current_doc = document_sessions[x_session_id]
+    current_doc = get_session_or_404(x_session_id)
+    # Tag every LLM call made for this request so the scheduler can share capacity fairly
+    current_session.set(x_session_id)
+    current_mode.set(request.mode)
+    trace = start_trace()
     mode = request.mode
     query = request.query
     chunks = current_doc["chunks"]
     sections = current_doc["structure"]["sections"]
+    if mode == "query_focused":
+        # Only retrieved chunks reach the LLM, so the prompt stays small as documents grow
+        chunks = await select_query_chunks(current_doc, query)
 
-    # If document is long (more than 5 chunks), use hierarchical summarization
-    use_hierarchical = len(chunks) > 5
+    # If the document doesn't fit one prompt, use hierarchical summarization
+    use_hierarchical = use_map_phase(current_doc, chunks)
 
     try:
-        if use_hierarchical and mode != "section_wise":
-            result = await hierarchical_summarize_async(chunks, mode, sections=sections, query=query)
+        failed_chunks = []
+        if mode == "section_wise":
+            # Per-section map-reduce, assembled locally in document order (no coherence check)
+            result = await section_wise_summarize_async(current_doc["cleaned_text"], sections)
+            summary = result["summary"]
+            coherence_texts = []
+        elif mode == "extractive":
+            # The document's own sentences, picked locally: no LLM call, nothing to check
+            summary = await summarize_async(mode, chunks)
+            coherence_texts = []
+        elif use_hierarchical:
+            known = await collect_known_summaries(current_doc, chunks)
+            result = await hierarchical_summarize_async(chunks, mode, sections=sections, query=query, known_summaries=known)
+            remember_chunk_summaries(x_session_id, current_doc, chunks, result["chunk_summaries"])
+            summary = result["summary"]
+            failed_chunks = result["failed_chunks"]
+            # Coherence over every chunk's map summary, already computed above
+            coherence_texts = result["chunk_summaries"]
         else:
-            result = await summarize_async(mode, chunks, sections=sections, query=query)
-
-        # Run coherence check if we have multiple chunks
-        coherence_info = None
-        if len(chunks) > 1 and mode != "section_wise":
-            # FIXED: Generate mini-summaries for coherence checking (grounding)
-            # We must await these calls
-            chunk_summaries = []
-            
-            # Analyze first 5 chunks for coherence (optimize performance)
-            check_chunks = chunks[:5] 
-            
-            # Concurrent summary generation for coherence
-            async def summarize_chunk(chunk):
-                try:
-                    return await call_llm_async(f"Summarize in 1 sentence: {chunk[:500]}")
-                except:
-                    return chunk[:200]
-            
-            # Run concurrently
-            check_tasks = [summarize_chunk(c) for c in check_chunks]
-            chunk_summaries = await asyncio.gather(*check_tasks)
-
-            # Check coherence of SUMMARIES
-            coherence_info = check_coherence(chunk_summaries)
-
-        return {
+            summary = await summarize_async(mode, chunks, sections=sections, query=query)
+            coherence_texts = chunks
+
+        coherence_info = await run_coherence_check(coherence_texts, mode)
+
+        response = {
             "status": "success",
             "mode": mode,
-            "summary": result,
+            "summary": summary,
             "coherence": coherence_info,
+            "failed_chunks": failed_chunks,
         }
+        if timings:
+            response["timings"] = trace.breakdown()
+        return response
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ─── ROUTE 2b: Stream Summary (Server-Sent Events) ───────
+@app.post("/summarize/stream")
+async def stream_summary(
+    request: SummarizeRequest,
+    x_session_id: str = Header(...)
+):
+    """
+    Same pipeline as /summarize, streamed as server-sent events:
+    - progress: one per map-phase chunk as it completes
+    - token: pieces of the final answer from streamGenerateContent
+    - coherence: coherence result (trailing)
+    - done / error
+    """
+    current_doc = get_session_or_404(x_session_id)
+    mode = request.mode
+    query = request.query
+    sections = current_doc["structure"]["sections"]
 
+    async def events():
+        current_session.set(x_session_id)
+        current_mode.set(mode)
+        try:
+            chunks = current_doc["chunks"]
+            if mode == "query_focused":
+                chunks = await select_query_chunks(current_doc, query)
+            use_hierarchical = use_map_phase(current_doc, chunks)
+            yield sse_event("start", {"mode": mode, "chunk_count": len(chunks), "hierarchical": use_hierarchical})
+
+            if mode == "section_wise":
+                # Sections are summarized concurrently; the assembled answer is sent as one token event
+                progress = asyncio.Queue()
+                section_task = asyncio.create_task(section_wise_summarize_async(
+                    current_doc["cleaned_text"], sections, lambda i, ok: progress.put_nowait({"section": i, "ok": ok})
+                ))
+                completed = 0
+                async for item in iter_progress(section_task, progress):
+                    completed += 1
+                    yield sse_event("progress", {**item, "completed": completed, "total": len(sections)})
+                yield sse_event("token", {"text": section_task.result()["summary"]})
+                yield sse_event("coherence", None)
+                yield sse_event("done", {"status": "success"})
+                return
+
+            if mode == "extractive":
+                yield sse_event("token", {"text": await summarize_async(mode, chunks)})
+                yield sse_event("coherence", None)
+                yield sse_event("done", {"status": "success"})
+                return
+
+            final_chunks = chunks
+            coherence_texts = chunks
+            if use_hierarchical:
+                progress = asyncio.Queue()
+
+                def on_progress(index: int, ok: bool):
+                    progress.put_nowait({"chunk": index, "ok": ok})
+
+                known = await collect_known_summaries(current_doc, chunks)
+                reduce_task = asyncio.create_task(reduce_chunks_async(chunks, on_progress, known))
+                completed = 0
+                async for item in iter_progress(reduce_task, progress):
+                    completed += 1
+                    yield sse_event("progress", {**item, "completed": completed, "total": len(chunks)})
+                reduced = reduce_task.result()
+                remember_chunk_summaries(x_session_id, current_doc, chunks, reduced["chunk_summaries"])
+                final_chunks = [reduced["reduced"]]
+                coherence_texts = reduced["chunk_summaries"]
+
+            messages = build_prompt_messages(mode, final_chunks, sections, query)
+            async for piece in stream_llm_async(messages):
+                yield sse_event("token", {"text": piece})
+
+            yield sse_event("coherence", await run_coherence_check(coherence_texts, mode))
+            yield sse_event("done", {"status": "success"})
+
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ─── ROUTE 2c: Batch Summary (several modes, one map phase) ─
+@app.post("/summarize/batch")
+async def batch_summary(
+    request: BatchSummarizeRequest,
+    x_session_id: str = Header(...)
+):
+    """
+    Runs several modes/queries over one upload.
+    Long documents are mapped and tree-reduced once; each mode then only needs its final
+    call, all running concurrently (about chunks + N LLM calls for N modes instead of N x chunks).
+    query_focused requests reuse the shared chunk summaries for their retrieved chunks.
+    Each item succeeds or fails on its own.
+    """
+    if not request.requests:
+        raise HTTPException(status_code=400, detail="No summarize requests given.")
+
+    current_doc = get_session_or_404(x_session_id)
+    current_session.set(x_session_id)
+    try:
+        outcome = await summarize_modes(current_doc, request.requests, x_session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {"status": "success", **outcome}
 
-# ─── ROUTE 3: Health Check ───────────────────────────────
+
+# ─── ROUTE 3: Health & Readiness ─────────────────────────
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "llm_client": get_client_stats(),
+        "llm_scheduler": llm_scheduler.get_stats(),
+        "llm_router": llm_router.get_stats(),
+        "llm_cache": llm_cache.get_stats() if llm_cache is not None else None,
+        "sessions": document_sessions.get_stats(),
+        "embeddings": embedding_batcher.get_stats(),
+        "jobs": job_queue.get_stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: stage/LLM/request latency histograms, token counters, service stats."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once the embedding model is loaded, 503 while it is still loading."""
+    status = get_model_status()
+    if not status["loaded"]:
+        state = "error" if status["error"] else "loading"
+        return JSONResponse(status_code=503, content={"status": state, "embedding_model": status})
+    return {"status": "ready", "embedding_model": status}
+
+
+# ─── ROUTE 4: Background Jobs ────────────────────────────
+def zip_members(filename: str, archive: zipfile.ZipFile) -> Tuple[List[zipfile.ZipInfo], List[dict]]:
+    """PDF/TXT members of an uploaded zip to queue, and rejected entries. Nothing is decompressed here."""
+    members, rejected = [], []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        name = f"{filename}/{info.filename}"
+        if not info.filename.endswith(SUPPORTED_EXTENSIONS):
+            rejected.append({"filename": name, "reason": "Only PDF and TXT files are supported."})
+        elif info.file_size > MAX_FILE_SIZE:
+            # Declared size; read_zip_member enforces the limit on the bytes actually inflated
+            rejected.append({"filename": name, "reason": "File too large."})
+        elif len(members) >= JOBS_MAX_ZIP_MEMBERS:
+            rejected.append({"filename": name, "reason": f"Too many files in the archive (max {JOBS_MAX_ZIP_MEMBERS})."})
+        else:
+            members.append(info)
+    return members, rejected
+
+
+def read_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, limit: int) -> Optional[bytes]:
+    """Decompresses one member, stopping after limit bytes: None if it is larger, whatever its header says."""
+    with archive.open(info) as member:
+        data = member.read(limit + 1)
+    return data if len(data) <= limit else None
+
+
+def job_view(job: dict, include_result: bool = False) -> dict:
+    """Public fields of a job record."""
+    view = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "priority": job["priority"],
+        "filename": job["filename"],
+        "modes": job["params"]["modes"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "error": job["error"],
+    }
+    if include_result:
+        view["result"] = job["result"]
+    return view
+
+
+async def run_job(job: dict, file_bytes: bytes, set_stage: Callable[[str], None]) -> dict:
+    """Job handler: parse -> clean -> chunk -> summarize every requested mode (shared map phase)."""
+    # All jobs share one scheduler lane, so interactive sessions keep their fair share
+    current_session.set("jobs")
+    params = job["params"]
+    items = [SummarizeRequest(mode=mode, query=params.get("query")) for mode in params["modes"]]
+
+    set_stage("ingesting")
+    ingested = await ingest_file(job["filename"], file_bytes)
+    chunks = ingested["chunks"]
+    doc = {
+        "cleaned_text": ingested["cleaned_text"],
+        "token_count": ingested["total_tokens"],
+        "chunks": chunks,
+        "structure": ingested["structure"],
+        "chunk_index": None,
+    }
+    if any(item.mode == "query_focused" for item in items):
+        doc["chunk_index"] = await index_chunks(chunks)
+
+    set_stage("summarizing")
+    outcome = await summarize_modes(doc, items)
+    return {
+        "metadata": ingested["metadata"],
+        "token_count": ingested["total_tokens"],
+        "chunk_count": len(chunks),
+        "section_count": ingested["structure"]["section_count"],
+        **outcome,
+    }
+
+
+@app.post("/jobs", status_code=202)
+async def submit_jobs(
+    files: List[UploadFile] = File(...),
+    modes: List[str] = Query(["executive"]),
+    query: Optional[str] = Query(None),
+    priority: int = Query(0),
+):
+    """
+    Queues one background job per file (zip archives are expanded, one job per PDF/TXT inside).
+    Higher priority runs first. Returns job IDs right away; poll GET /jobs/{id} or
+    stream GET /jobs/{id}/events for status, and fetch the result from GET /jobs/{id}.
+    """
+    params = {"modes": modes, "query": query}
+    submitted, rejected = [], []
+
+    # Pass 1: list what this request would queue. Zips are opened from the spooled upload and
+    # only their directory is read; each member is inflated right before its job is stored.
+    planned = []  # (job filename, zip archive or None, ZipInfo or UploadFile)
+    archives = []
+    try:
+        for file in files:
+            size = file.size or 0
+            if file.filename.endswith(".zip"):
+                if size > MAX_ZIP_SIZE:
+                    rejected.append({"filename": file.filename, "reason": "File too large."})
+                    continue
+                try:
+                    archive = await asyncio.to_thread(zipfile.ZipFile, file.file)
+                except zipfile.BadZipFile:
+                    rejected.append({"filename": file.filename, "reason": "Not a valid zip archive."})
+                    continue
+                archives.append(archive)
+                members, skipped = zip_members(file.filename, archive)
+                rejected.extend(skipped)
+                planned.extend((f"{file.filename}/{info.filename}", archive, info) for info in members)
+            elif not file.filename.endswith(SUPPORTED_EXTENSIONS):
+                rejected.append({"filename": file.filename, "reason": "Only PDF, TXT and ZIP files are supported."})
+            elif size > MAX_FILE_SIZE:
+                rejected.append({"filename": file.filename, "reason": "File too large."})
+            else:
+                planned.append((file.filename, None, file))
+
+        # All or nothing: a full queue rejects the whole request before any job is created
+        try:
+            job_queue.check_capacity(len(planned))
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+        # Pass 2: one file in memory at a time, limits enforced on the bytes actually read
+        unzipped = 0
+        for filename, archive, source in planned:
+            if archive is None:
+                data = await source.read(MAX_FILE_SIZE + 1)
+                if len(data) > MAX_FILE_SIZE:
+                    rejected.append({"filename": filename, "reason": "File too large."})
+                    continue
+            else:
+                limit = min(MAX_FILE_SIZE, MAX_UNZIPPED_SIZE - unzipped)
+                try:
+                    data = await asyncio.to_thread(read_zip_member, archive, source, limit)
+                except Exception as e:
+                    rejected.append({"filename": filename, "reason": f"Could not extract: {e}"})
+                    continue
+                if data is None:
+                    reason = "File too large." if limit == MAX_FILE_SIZE else "Zip contents exceed the size limit."
+                    rejected.append({"filename": filename, "reason": reason})
+                    continue
+                unzipped += len(data)
+            try:
+                job = await job_queue.submit(filename, data, params, priority)
+            except (QueueFullError, RuntimeError) as e:
+                # Concurrent submissions filled the queue after the check: report it per file
+                rejected.append({"filename": filename, "reason": str(e)})
+                continue
+            submitted.append(job_view(job))
+    finally:
+        for archive in archives:
+            archive.close()
+
+    return {"status": "accepted", "jobs": submitted, "rejected": rejected}
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = Query(None), limit: int = Query(100, ge=1, le=1000)):
+    """Most recent jobs first, optionally filtered by status."""
+    return {"jobs": [job_view(job) for job in job_queue.list(status, limit)]}
+
+
+def get_job_or_404(job_id: str) -> dict:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return job_view(get_job_or_404(job_id), include_result=True)
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancels a queued or running job (finished jobs are left as they are)."""
+    get_job_or_404(job_id)
+    return job_view(job_queue.cancel(job_id))
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Server-sent 'status' events on every status/stage change, ending once the job is finished."""
+    get_job_or_404(job_id)
+
+    async def events():
+        updates = job_queue.subscribe(job_id)
+        try:
+            # Read after subscribing so no change between the two is missed
+            job = job_queue.get(job_id)
+            yield sse_event("status", job_view(job))
+            while job["status"] not in TERMINAL_STATUSES:
+                job = await updates.get()
+                yield sse_event("status", job_view(job))
+        finally:
+            job_queue.unsubscribe(job_id, updates)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,34 +1,239 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import hashlib
+import re
+import zlib
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import numpy as np
 import tiktoken
 
+# Boundaries tried in order of preference when closing a chunk
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+# A boundary is only used if the chunk keeps at least this share of its token budget;
+# otherwise a later (weaker) separator is tried, and finally a hard cut on a token edge.
+MIN_FILL_RATIO = 0.5
+
+# Content-defined boundaries (split_document(content_defined=True)):
+# cut points are line and sentence ends; one is an anchor when the text just before it
+# hashes to 0 mod a divisor, so where chunks end depends on the text, not on its position.
+# Weak anchors (hash even) are the fallback for windows without a strong one.
+_CUT_POINT = re.compile(r"\n+|(?<=[.!?]) ")
+ANCHOR_WINDOW_CHARS = 48     # text before a cut point that decides whether it is an anchor
+CDC_MIN_FILL_RATIO = 0.75    # chunks end at the first anchor past 75% of chunk_size
+TOKENS_PER_CUT_POINT = 20    # typical line/sentence length, sizes the anchor probability
+
+
+@lru_cache(maxsize=1)
+def get_encoder() -> tiktoken.Encoding:
+    """Loads the tokenizer once per process."""
+    return tiktoken.get_encoding("cl100k_base")  # Used by GPT-4 models
+
+
 def get_token_count(text: str) -> int:
     """Counts tokens using OpenAI's tokenizer for accuracy."""
-    encoder = tiktoken.get_encoding("cl100k_base")  # Used by GPT-4 models
-    return len(encoder.encode(text))
+    return len(get_encoder().encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=1)
+def _token_byte_lengths() -> np.ndarray:
+    """Byte length of every token in the vocabulary (built once)."""
+    encoder = get_encoder()
+    lengths = np.zeros(encoder.n_vocab, dtype=np.int64)
+    for rank in range(encoder.n_vocab):
+        try:
+            lengths[rank] = len(encoder.decode_single_token_bytes(rank))
+        except KeyError:
+            pass  # unused rank
+    return lengths
+
+
+def _token_offsets(encoder: tiktoken.Encoding, text: str, tokens: List[int]) -> List[int]:
+    """Character offset where each token starts."""
+    if text.isascii():
+        # Cleaned text is ASCII, so byte lengths are character lengths: one vectorized cumsum
+        lengths = _token_byte_lengths()[np.asarray(tokens, dtype=np.int64)]
+        offsets = np.zeros(len(tokens), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        return offsets.tolist()
+    return encoder.decode_with_offsets(tokens)[1]
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash of a chunk (keys map-phase summaries across uploads)."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _anchor_positions(text: str, chunk_size: int) -> Tuple[List[int], List[int]]:
+    """Character offsets of the (strong, weak) anchor cut points in text, each sorted."""
+    window_tokens = chunk_size * (1 - CDC_MIN_FILL_RATIO)
+    # About 3 strong anchors expected per window, so a chunk rarely needs a weak one
+    divisor = max(2, int(window_tokens / TOKENS_PER_CUT_POINT / 3))
+    strong, weak = [], []
+    for match in _CUT_POINT.finditer(text):
+        end = match.end()
+        value = zlib.crc32(text[max(0, end - ANCHOR_WINDOW_CHARS):end].encode("utf-8"))
+        if value % divisor == 0:
+            strong.append(end)
+        if value % 2 == 0:
+            weak.append(end)
+    return strong, weak
+
+
+def _first_in(positions: List[int], lo: int, hi: int) -> Optional[int]:
+    i = bisect_left(positions, lo)
+    return positions[i] if i < len(positions) and positions[i] <= hi else None
+
+
+def _best_boundary(text: str, lo: int, hi: int) -> int:
+    """Last paragraph/line/sentence/word break in text[lo:hi], or hi if there is none."""
+    for separator in SEPARATORS:
+        idx = text.rfind(separator, lo, hi)
+        if idx != -1:
+            return idx + len(separator)
+    return hi
+
+
+def split_document(text: str, chunk_size: int = 2000, chunk_overlap: int = 200, content_defined: bool = False) -> dict:
+    """
+    Splits text into token-bounded chunks in a single pass.
+
+    The text is encoded ONCE. Each chunk takes up to chunk_size tokens, then its end is
+    pulled back to the best boundary (paragraph > line > sentence > word) that keeps the
+    chunk at least half full. The next chunk starts chunk_overlap tokens earlier, on a word edge.
+
+    content_defined=True ends a chunk at the first anchor (see _anchor_positions) past
+    75% of chunk_size instead (strong, else weak, else the best boundary).
+    Anchors depend only on nearby text, so after an edit the chunk boundaries fall back
+    in step with the previous version and later chunks (and their hashes) are unchanged.
+
+    Returns:
+    - chunks: chunk strings (whitespace-trimmed)
+    - spans: (start, end) character offsets of each chunk in text
+    - token_counts: tokens per chunk (taken from the single encoding; BPE merges at a
+      chunk edge can make this differ by a token from re-encoding the chunk alone)
+    - token_spans: (start, end) token indices of each chunk
+    - total_tokens: tokens in the whole text
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+    encoder = get_encoder()
+    tokens = encoder.encode(text, disallowed_special=())
+    total = len(tokens)
+    result = {"chunks": [], "spans": [], "token_counts": [], "token_spans": [], "total_tokens": total}
+    if total == 0:
+        return result
+
+    offsets = _token_offsets(encoder, text, tokens)
+    offsets.append(len(text))  # sentinel: offsets[total] is the end of the text
+    anchors = _anchor_positions(text, chunk_size) if content_defined else None
+    min_fill = max(1, int(chunk_size * (CDC_MIN_FILL_RATIO if content_defined else MIN_FILL_RATIO)))
+
+    start_tok = 0
+    while start_tok < total:
+        end_tok = min(start_tok + chunk_size, total)
+
+        if end_tok < total:
+            lo, hi = offsets[start_tok + min_fill], offsets[end_tok]
+            boundary = None
+            if anchors is not None:
+                strong, weak = anchors
+                boundary = _first_in(strong, lo, hi)
+                if boundary is None:
+                    boundary = _first_in(weak, lo, hi)
+            if boundary is None:
+                boundary = _best_boundary(text, lo, hi)
+            # Snap down to the token that starts at or before the boundary
+            end_tok = max(start_tok + 1, bisect_right(offsets, boundary, start_tok + 1, end_tok + 1) - 1)
+
+        start_char, end_char = offsets[start_tok], offsets[end_tok]
+        while start_char < end_char and text[start_char].isspace():
+            start_char += 1
+        while end_char > start_char and text[end_char - 1].isspace():
+            end_char -= 1
+        if end_char > start_char:
+            result["chunks"].append(text[start_char:end_char])
+            result["spans"].append((start_char, end_char))
+            result["token_counts"].append(end_tok - start_tok)
+            result["token_spans"].append((start_tok, end_tok))
+
+        if end_tok >= total:
+            break
+
+        # Overlap: step back, then forward to the first token that begins a word
+        next_tok = max(start_tok + 1, end_tok - chunk_overlap)
+        for t in range(next_tok, end_tok):
+            if text[offsets[t]].isspace():
+                next_tok = t
+                break
+        start_tok = next_tok
+
+    return result
 
 
 def chunk_document(text: str, chunk_size: int = 2000, chunk_overlap: int = 200) -> list[str]:
     """
-    Splits text into chunks using recursive character splitting.
+    Splits text into chunks of at most chunk_size tokens.
 
     chunk_size: Max tokens per chunk (2000 is safe for GPT-4o-mini)
     chunk_overlap: How many tokens overlap between consecutive chunks
                    (prevents losing context at boundaries)
 
-    RecursiveCharacterTextSplitter tries to split on, in order:
-    1. Double newlines (paragraph breaks) — best semantic boundary
-    2. Single newlines
-    3. Periods (sentence boundaries)
-    4. Spaces (word boundaries) — last resort
+    See split_document for spans and per-chunk token counts.
+    """
+    return split_document(text, chunk_size, chunk_overlap)["chunks"]
+
+
+class StreamingChunker:
+    """
+    Incremental split_document: feed text as it arrives (e.g. page by page) and get
+    finished chunks back. Only the unfinished tail is kept, so memory stays bounded.
 
-    This means it ALWAYS tries to preserve meaning before resorting to hard cuts.
+    The last chunk of each split may still grow, so it is held back and re-split
+    together with the next piece of text.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=get_token_count,  # Measure by TOKENS, not characters
-        separators=["\n\n", "\n", ". ", " "],
-    )
-
-    chunks = splitter.split_text(text)
-    return chunks
+
+    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 200, content_defined: bool = False):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.content_defined = content_defined
+        self.total_tokens = 0
+        self._buffer = ""
+        self._base = 0             # offset of the buffer start in the full text
+        self._consumed_tokens = 0  # tokens already dropped from the buffer
+        self._min_chars = chunk_size * 8  # wait for ~2 chunks of text before splitting
+
+    def _split(self, final: bool) -> List[dict]:
+        result = split_document(self._buffer, self.chunk_size, self.chunk_overlap, self.content_defined)
+        count = len(result["chunks"]) if final else len(result["chunks"]) - 1
+        emitted = []
+        for i in range(max(0, count)):
+            start, end = result["spans"][i]
+            emitted.append({
+                "text": result["chunks"][i],
+                "span": (self._base + start, self._base + end),
+                "token_count": result["token_counts"][i],
+            })
+
+        if final:
+            self.total_tokens = self._consumed_tokens + result["total_tokens"]
+            self._buffer = ""
+        elif count > 0:
+            # Keep the unfinished last chunk (which already includes the overlap)
+            cut = result["spans"][-1][0]
+            self._consumed_tokens += result["token_spans"][-1][0]
+            self._buffer = self._buffer[cut:]
+            self._base += cut
+        return emitted
+
+    def feed(self, text: str) -> List[dict]:
+        """Adds text; returns the chunks that can no longer change."""
+        self._buffer += text
+        if len(self._buffer) < self._min_chars:
+            return []
+        return self._split(final=False)
+
+    def finish(self) -> List[dict]:
+        """Returns the remaining chunks; total_tokens is final afterwards."""
+        return self._split(final=True)
@@ -1,56 +1,56 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from .embeddings import embedding_batcher
+from .telemetry import span
 
-# Load model once (takes a few seconds on first run, then cached)
-model = SentenceTransformer("all-MiniLM-L6-v2")  # Small, fast, accurate model
+# Thresholds for pair flags
+REDUNDANT_THRESHOLD = 0.85      # nearly identical summaries
+CONTRADICTION_THRESHOLD = 0.15  # adjacent summaries that don't relate
 
+# Rows of the similarity matrix computed at a time (bounds memory to block x n)
+_BLOCK_ROWS = 1024
 
-def get_embeddings(texts: list[str]) -> np.ndarray:
-    """Converts a list of text strings into embedding vectors."""
-    return model.encode(texts)
 
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """Unit-length rows, computed once (zero vectors stay zero)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
 
-def cosine_similarity(vec_a: np.ndarray, vec_b: np.ndarray) -> float:
-    """Computes cosine similarity between two vectors. Range: -1 to 1."""
-    return float(np.dot(vec_a, vec_b) / (np.linalg.norm(vec_a) * np.linalg.norm(vec_b)))
 
-
-def check_coherence(chunk_summaries: list[str], threshold: float = 0.3) -> dict:
+def score_embeddings(embeddings: np.ndarray, threshold: float = 0.3) -> dict:
     """
-    Enhanced coherence checking with contradiction detection.
-    
-    Checks if chunk summaries are coherent with each other.
+    Coherence metrics from summary embeddings (see check_coherence_async for the output format).
 
-    Returns:
-    - coherence_score: Average pairwise similarity (higher = more coherent)
-    - is_coherent: Boolean — True if above threshold
-    - redundant_pairs: List of summary pairs that are too similar (>0.85)
-    - contradictory_pairs: List of adjacent summary pairs that are too different (<0.15)
-    - flagged: True if any issues detected
+    Vectorized: similarities come from matrix products of the normalized embeddings.
+    - mean pairwise similarity: from ||sum of unit vectors||^2, no n x n matrix needed
+    - redundant pairs: upper triangle of unit @ unit.T > 0.85, computed in row blocks
+    - contradictions: row-wise dot products of neighbours (i, i+1) < 0.15
     """
-    if len(chunk_summaries) < 2:
+    unit = normalize_rows(embeddings)
+    n = len(unit)
+    if n < 2:
         return {"coherence_score": 1.0, "is_coherent": True, "redundant_pairs": [], "contradictory_pairs": [], "flagged": False}
 
-    embeddings = get_embeddings(chunk_summaries)
+    # sum_{i,j} s_ij = ||sum_i u_i||^2; drop the diagonal and halve for i < j
+    total = unit.sum(axis=0, dtype=np.float64)
+    diagonal = float(np.einsum("ij,ij->", unit, unit, dtype=np.float64))
+    avg_similarity = float((total @ total - diagonal) / 2 / (n * (n - 1) / 2))
 
-    similarities = []
     redundant_pairs = []
-    contradictory_pairs = []  # NEW: Detect contradictions
-
-    for i in range(len(embeddings)):
-        for j in range(i + 1, len(embeddings)):
-            sim = cosine_similarity(embeddings[i], embeddings[j])
-            similarities.append(sim)
+    for start in range(0, n, _BLOCK_ROWS):
+        block = unit[start:start + _BLOCK_ROWS] @ unit.T
+        mask = block > REDUNDANT_THRESHOLD
+        # Keep only j > i (upper triangle)
+        mask &= np.arange(n)[None, :] > np.arange(start, start + len(block))[:, None]
+        for row, col in np.argwhere(mask):
+            redundant_pairs.append((start + int(row), int(col), round(float(block[row, col]), 3)))
 
-            # Flag pairs that are nearly identical (redundant)
-            if sim > 0.85:
-                redundant_pairs.append((i, j, round(sim, 3)))
-            
-            # NEW: Contradiction detection - adjacent chunks should relate
-            if abs(i - j) == 1 and sim < 0.15:  # Adjacent chunks
-                contradictory_pairs.append((i, j, round(sim, 3)))
-
-    avg_similarity = float(np.mean(similarities))
+    adjacent = np.einsum("ij,ij->i", unit[:-1], unit[1:])
+    contradictory_pairs = [
+        (int(i), int(i) + 1, round(float(adjacent[i]), 3))
+        for i in np.flatnonzero(adjacent < CONTRADICTION_THRESHOLD)
+    ]
 
     return {
         "coherence_score": round(avg_similarity, 3),
@@ -63,3 +63,25 @@ def check_coherence(chunk_summaries: list[str], threshold: float = 0.3) -> dict:
             "contradiction_count": len(contradictory_pairs),
         }
     }
+
+
+async def check_coherence_async(chunk_summaries: list[str], threshold: float = 0.3) -> dict:
+    """
+    Enhanced coherence checking with contradiction detection: checks if chunk summaries
+    are coherent with each other. The embeddings come from the shared micro-batcher, so
+    encoding runs in a worker thread (the event loop stays free) and is batched with
+    texts from other in-flight requests.
+
+    Returns:
+    - coherence_score: Average pairwise similarity (higher = more coherent)
+    - is_coherent: Boolean — True if above threshold
+    - redundant_pairs: List of summary pairs that are too similar (>0.85)
+    - contradictory_pairs: List of adjacent summary pairs that are too different (<0.15)
+    - flagged: True if any issues detected
+    """
+    if len(chunk_summaries) < 2:
+        return {"coherence_score": 1.0, "is_coherent": True, "redundant_pairs": [], "contradictory_pairs": [], "flagged": False}
+
+    with span("coherence"):
+        embeddings = await embedding_batcher.embed(chunk_summaries)
+        return score_embeddings(embeddings, threshold)
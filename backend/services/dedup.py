@@ -0,0 +1,77 @@
+import re
+import zlib
+from typing import Dict, List, Tuple
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+def _shingle_hashes(text: str, shingle_words: int) -> np.ndarray:
+    """32-bit hashes of the word n-grams (shingles) of text, lowercased; a short text is one shingle."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= shingle_words:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signatures(texts: List[str], shingle_words: int = 5, num_perm: int = 128, seed: int = 1) -> np.ndarray:
+    """
+    MinHash signature per text, shape (n_texts, num_perm) uint32. The share of equal
+    positions between two signatures estimates the Jaccard similarity of their shingle sets.
+    """
+    rng = np.random.default_rng(seed)
+    # h(x) = (a*x + b) mod 2^32 with odd a: one cheap permutation of the hash space per row
+    a = (rng.integers(0, 1 << 31, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+    b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(text, shingle_words)
+        signatures[row] = ((hashes[None, :] * a[:, None] + b[:, None]) & _MASK).min(axis=1)
+    return signatures
+
+
+def _band_shape(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows) for LSH: the most rows per band whose candidate threshold (1/bands)^(1/rows)
+    stays well below threshold, so pairs above it almost surely share a band.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold - 0.1:
+            best = (bands, rows)
+    return best
+
+
+def find_near_duplicates(texts: List[str], threshold: float, shingle_words: int = 5, num_perm: int = 128) -> List[int]:
+    """
+    Representative index for every text: the first earlier representative whose estimated
+    Jaccard similarity is at least threshold, or the text itself. Candidates come from LSH
+    buckets (signature bands), so the work stays about linear in the number of texts.
+    """
+    if len(texts) < 2:
+        return list(range(len(texts)))
+    signatures = minhash_signatures(texts, shingle_words, num_perm)
+    bands, rows = _band_shape(num_perm, threshold)
+
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    representatives = []
+    for i, signature in enumerate(signatures):
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(bands)]
+        candidates = sorted({j for key in keys for j in buckets.get(key, ())})
+        match = i
+        for j in candidates:
+            if np.mean(signatures[j] == signature) >= threshold:
+                match = j
+                break
+        representatives.append(match)
+        if match == i:
+            # Only representatives are indexed, so a cluster never chains away from its first member
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+    return representatives
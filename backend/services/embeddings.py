@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from config import EMBEDDING_MODEL_NAME, EMBED_BATCH_SIZE, EMBED_BATCH_WAIT_MS, EMBED_CACHE_ENTRIES
+
+# Loaded on first use, not at import: importing sentence_transformers pulls in torch,
+# which alone takes seconds and would delay every worker start and /health.
+_model = None
+_model_lock = threading.Lock()
+_model_error: Optional[str] = None
+
+
+def get_model():
+    """Returns the shared SentenceTransformer, loading it once (thread-safe)."""
+    global _model, _model_error
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(EMBEDDING_MODEL_NAME)  # Small, fast, accurate model
+                    _model_error = None
+                except Exception as e:
+                    _model_error = str(e)
+                    raise
+    return _model
+
+
+def warm_up_model() -> None:
+    """Loads the model and runs one encode so the first real request pays nothing (blocking)."""
+    get_model().encode(["warm up"])
+
+
+def get_model_status() -> dict:
+    return {"loaded": _model is not None, "error": _model_error}
+
+
+class EmbeddingBatcher:
+    """
+    Async embedding service shared by all requests.
+
+    Texts from concurrent callers are queued and encoded together in one model.encode
+    call, flushed when max_batch texts are waiting or max_wait_ms after the first one
+    arrived. Encoding runs on a dedicated worker thread, so the event loop never blocks.
+    Vectors are cached in an LRU keyed by text hash, and identical texts already
+    queued or being encoded share one result.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: float, cache_entries: int):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._waiting: Dict[str, asyncio.Future] = {}           # key -> future (queued or encoding)
+        self._pending: List[Tuple[str, str]] = []               # (key, text) not yet flushed
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._encoding: Set[asyncio.Task] = set()               # flushed batches (referenced until done)
+        # One thread: batches run back to back (the model already uses several cores per batch)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self.stats = {"texts": 0, "cache_hits": 0, "batches": 0, "encoded": 0}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns one float32 vector per text, shape (len(texts), dim)."""
+        loop = asyncio.get_running_loop()
+        results: List[object] = []
+        for text in texts:
+            self.stats["texts"] += 1
+            key = self._key(text)
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                results.append(vector)
+                continue
+            future = self._waiting.get(key)
+            if future is None:
+                future = loop.create_future()
+                self._waiting[key] = future
+                self._pending.append((key, text))
+            results.append(future)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._pending and self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        # shield: a cancelled caller must not cancel a vector other callers are waiting for.
+        # Every future is awaited (a failed batch fails all of them), then the first error is raised once.
+        waiting = [asyncio.shield(r) for r in results if isinstance(r, asyncio.Future)]
+        outcomes = iter(await asyncio.gather(*waiting, return_exceptions=True))
+        vectors = [next(outcomes) if isinstance(r, asyncio.Future) else r for r in results]
+        for vector in vectors:
+            if isinstance(vector, BaseException):
+                raise vector
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._encode(batch))
+            self._encoding.add(task)
+            task.add_done_callback(self._encoding.discard)
+
+    async def _encode(self, batch: List[Tuple[str, str]]) -> None:
+        loop = asyncio.get_running_loop()
+        texts = [text for _, text in batch]
+        try:
+            vectors = await loop.run_in_executor(self._executor, lambda: get_model().encode(texts))
+        except Exception as e:
+            for key, _ in batch:
+                future = self._waiting.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["encoded"] += len(batch)
+        for (key, _), vector in zip(batch, np.asarray(vectors, dtype=np.float32)):
+            self._cache[key] = vector
+            future = self._waiting.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "cached_vectors": len(self._cache),
+            "mean_batch_size": round(self.stats["encoded"] / batches, 1) if batches else 0.0,
+        }
+
+
+# Shared batcher for every request in this process
+embedding_batcher = EmbeddingBatcher(
+    max_batch=EMBED_BATCH_SIZE,
+    max_wait_ms=EMBED_BATCH_WAIT_MS,
+    cache_entries=EMBED_CACHE_ENTRIES,
+)
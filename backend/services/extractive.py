@@ -0,0 +1,159 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Sentence ends (followed by what looks like a sentence start) and line breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\s*\n+\s*")
+_TERM = re.compile(r"[a-z0-9]+")
+
+# Headings, page numbers and other fragments are never selected
+MIN_SENTENCE_WORDS = 4
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i in into is it its of on or "
+    "our she so that the their them there these they this to was we were which while who will with "
+    "would you your not no can could may might also than then such".split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (and lines that aren't part of one) of text, in order."""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+
+def _terms(sentence: str) -> List[str]:
+    return [t for t in _TERM.findall(sentence.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def tfidf_vectors(sentences: List[str], max_terms: int = 4096) -> np.ndarray:
+    """
+    TF-IDF rows (sublinear tf, smoothed idf) with unit length, shape (n_sentences, n_terms)
+    float32. Only the max_terms terms that occur in the most sentences are kept.
+    """
+    term_lists = [_terms(s) for s in sentences]
+    document_frequency = Counter(t for terms in term_lists for t in set(terms))
+    vocabulary = {t: i for i, (t, _) in enumerate(document_frequency.most_common(max_terms))}
+
+    n = len(sentences)
+    vectors = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for row, terms in enumerate(term_lists):
+        for term, count in Counter(terms).items():
+            column = vocabulary.get(term)
+            if column is not None:
+                vectors[row, column] = 1 + math.log(count)
+    idf = np.array(
+        [math.log((1 + n) / (1 + document_frequency[t])) + 1 for t in vocabulary], dtype=np.float32
+    )
+    vectors *= idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def textrank_scores(similarity: np.ndarray, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+    """PageRank over the sentence similarity graph (power iteration); scores sum to 1."""
+    n = len(similarity)
+    weights = similarity.astype(np.float64)
+    np.fill_diagonal(weights, 0.0)
+    row_sums = weights.sum(axis=1, keepdims=True)
+    # A sentence similar to nothing links to every sentence equally
+    transition = np.divide(weights, row_sums, out=np.full_like(weights, 1.0 / n), where=row_sums > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def mmr_select(
+    scores: np.ndarray,
+    similarity: np.ndarray,
+    lengths: List[int],
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    diversity: float = 0.3,
+) -> List[int]:
+    """
+    Maximal marginal relevance: repeatedly takes the sentence with the best
+    (1 - diversity) * score - diversity * (similarity to the sentences already taken),
+    until max_sentences or max_chars is reached. Returns indices in document order.
+    """
+    n = len(scores)
+    relevance = scores / scores.max() if n and scores.max() > 0 else np.zeros(n)
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    selected, chars = [], 0
+    while available.any():
+        if max_sentences is not None and len(selected) >= max_sentences:
+            break
+        gain = np.where(available, (1 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(gain))
+        if max_chars is not None and selected and chars + lengths[best] > max_chars:
+            available[best] = False  # too long for what's left; a shorter one may still fit
+            continue
+        selected.append(best)
+        chars += lengths[best]
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return sorted(selected)
+
+
+def rank_sentences(sentences: List[str], max_terms: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """(TextRank score per sentence, cosine similarity matrix) over TF-IDF vectors."""
+    vectors = tfidf_vectors(sentences, max_terms)
+    similarity = vectors @ vectors.T
+    return textrank_scores(similarity), similarity
+
+
+def select_sentences(
+    sentences: List[str],
+    max_sentences: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    diversity: float = 0.3,
+    max_terms: int = 4096,
+) -> List[str]:
+    """The most salient, mutually different sentences (TextRank + MMR), in document order."""
+    candidates = list(dict.fromkeys(s for s in sentences if len(s.split()) >= MIN_SENTENCE_WORDS))
+    if len(candidates) <= 1:
+        return candidates
+    scores, similarity = rank_sentences(candidates, max_terms)
+    picked = mmr_select(scores, similarity, [len(s) for s in candidates], max_sentences, max_chars, diversity)
+    return [candidates[i] for i in picked]
+
+
+def compress_text(text: str, ratio: float, diversity: float = 0.3) -> str:
+    """
+    Pre-filter for a map-phase prompt: keeps the most salient sentences of text, about
+    ratio of its characters, in their original order. Short texts come back unchanged.
+    """
+    sentences = split_sentences(text)
+    if ratio >= 1 or len(sentences) <= 3:
+        return text
+    kept = select_sentences(sentences, max_chars=int(len(text) * ratio), diversity=diversity)
+    return " ".join(kept) if kept else text
+
+
+def extractive_summary(
+    chunks: List[str],
+    max_sentences: int = 10,
+    max_candidates: int = 2000,
+    diversity: float = 0.3,
+    max_terms: int = 4096,
+) -> str:
+    """
+    Summary made of the document's own sentences, without any LLM call.
+    Long documents are narrowed down per chunk first, so the similarity graph stays
+    at most max_candidates sentences.
+    """
+    per_chunk = [split_sentences(chunk) for chunk in chunks]
+    total = sum(len(sentences) for sentences in per_chunk)
+    if total > max_candidates:
+        quota = max(1, max_candidates // len(chunks))
+        per_chunk = [select_sentences(sentences, quota, None, diversity, max_terms) for sentences in per_chunk]
+    sentences = [s for sentences in per_chunk for s in sentences]
+    return " ".join(select_sentences(sentences, max_sentences, None, diversity, max_terms))
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterator, Optional
+from .pdf_parser import iter_pdf_pages, read_pdf_metadata, aiter_pdf_pages_parallel, use_process_pool
+from .preprocessor import StreamingPreprocessor
+from .chunker import StreamingChunker, chunk_hash
+from .planner import model_plan
+from .telemetry import record_stage
+from config import CHUNK_CONTENT_DEFINED, INGEST_PAGE_QUEUE_SIZE
+
+_DONE = object()
+
+
+async def _pages_from_thread(make_pages: Callable[[], Iterator[str]]) -> AsyncIterator[str]:
+    """
+    Runs a blocking page generator in a worker thread and hands pages to the event loop
+    through a bounded queue. The parser can run at most INGEST_PAGE_QUEUE_SIZE pages ahead,
+    so only a few pages of raw text are alive at once.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INGEST_PAGE_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce() -> None:
+        try:
+            for page in make_pages():
+                if stop.is_set():
+                    break
+                put(page)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (error/cancel): unblock the producer and let it exit
+        stop.set()
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+
+
+async def _page_texts(pages: AsyncIterator[dict]) -> AsyncIterator[str]:
+    async for page in pages:
+        yield page["text"]
+
+
+async def _ingest_pages(
+    pages: AsyncIterator[str],
+    on_chunk: Optional[Callable[[int, str, int], None]] = None,
+) -> dict:
+    """
+    Cleans and chunks pages as they arrive; on_chunk(index, text, token_count) fires as soon as a chunk is final.
+    Time waiting for pages (extraction), cleaning and chunking is recorded as the
+    extract / preprocess / chunk stages.
+    """
+    preprocessor = StreamingPreprocessor()
+    # Chunk size fits the configured model (see planner.plan_for_model)
+    chunker = StreamingChunker(model_plan["chunk_size"], model_plan["chunk_overlap"], CHUNK_CONTENT_DEFINED)
+    cleaned_parts = []
+    chunks, chunk_hashes = [], []
+
+    def collect(emitted) -> None:
+        for chunk in emitted:
+            chunks.append(chunk["text"])
+            chunk_hashes.append(chunk_hash(chunk["text"]))
+            if on_chunk is not None:
+                on_chunk(len(chunks) - 1, chunk["text"], chunk["token_count"])
+
+    seconds = {"extract": 0.0, "preprocess": 0.0, "chunk": 0.0}
+    clock = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        seconds[stage] += now - clock
+        clock = now
+
+    async for page_text in pages:
+        lap("extract")
+        # Cleaning and heading detection in one pass; page breaks become paragraph breaks
+        piece = preprocessor.feed(page_text)
+        lap("preprocess")
+        if not piece:
+            continue
+        cleaned_parts.append(piece)
+        collect(chunker.feed(piece))
+        lap("chunk")
+    lap("extract")
+    collect(chunker.finish())
+    lap("chunk")
+    for stage, elapsed in seconds.items():
+        record_stage(stage, elapsed)
+
+    return {
+        "cleaned_text": "".join(cleaned_parts),
+        "structure": preprocessor.finish(),  # sections as offsets into cleaned_text
+        "chunks": chunks,
+        "chunk_hashes": chunk_hashes,  # content hashes: map summaries are reused across uploads by hash
+        "total_tokens": chunker.total_tokens,
+    }
+
+
+async def ingest_pdf_async(file_bytes: bytes, on_chunk: Optional[Callable[[int, str, int], None]] = None) -> dict:
+    """
+    Page-streaming PDF pipeline: PyMuPDF parses pages in a worker thread while the
+    event loop cleans and chunks the pages already parsed (and, through on_chunk,
+    can start summarizing finished chunks).
+    Large PDFs are parsed on the process pool instead, range by range, still in page order.
+    """
+    metadata = await asyncio.to_thread(read_pdf_metadata, file_bytes)
+    if use_process_pool(metadata["page_count"]):
+        pages = _page_texts(aiter_pdf_pages_parallel(file_bytes, metadata["page_count"]))
+    else:
+        pages = _pages_from_thread(lambda: (page["text"] for page in iter_pdf_pages(file_bytes)))
+    result = await _ingest_pages(pages, on_chunk)
+    result["metadata"] = metadata
+    return result
+
+
+async def ingest_text_async(text: str, metadata: dict, on_chunk: Optional[Callable[[int, str, int], None]] = None) -> dict:
+    """Same pipeline for plain text (a single page)."""
+
+    async def single_page() -> AsyncIterator[str]:
+        yield text
+
+    result = await _ingest_pages(single_page(), on_chunk)
+    result["metadata"] = metadata
+    return result
@@ -0,0 +1,309 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from config import JOBS_DIR, JOBS_WORKERS, JOBS_MAX_QUEUED, JOBS_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+# handler(job, file_bytes, set_stage) -> result dict
+JobHandler = Callable[[dict, bytes, Callable[[str], None]], Awaitable[dict]]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobStore:
+    """
+    SQLite-backed job records (WAL). Uploaded files live next to the database until
+    their job finishes, so queued work survives a restart.
+    Every call is a small single-row statement; they run inline on the event loop.
+    """
+
+    _COLUMNS = ("id", "status", "stage", "priority", "filename", "file_path", "params",
+                "result", "error", "created", "updated")
+
+    def __init__(self, directory: str):
+        self.files_dir = os.path.join(directory, "files")
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "jobs.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, priority INTEGER NOT NULL, "
+            "filename TEXT NOT NULL, file_path TEXT, params TEXT NOT NULL, result TEXT, error TEXT, "
+            "created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, priority, created)")
+        self._db.commit()
+
+    def _row_to_job(self, row) -> dict:
+        job = dict(zip(self._COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def file_path_for(self, job_id: str) -> str:
+        return os.path.join(self.files_dir, job_id)
+
+    def create(self, job_id: str, filename: str, params: dict, priority: int) -> dict:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, stage, priority, filename, file_path, params, created, updated) "
+                "VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, priority, filename, self.file_path_for(job_id), json.dumps(params), now, now),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[dict]:
+        query = f"SELECT {', '.join(self._COLUMNS)} FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, args + (limit,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def update(self, job_id: str, **fields: Any) -> Optional[dict]:
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+        return self.get(job_id)
+
+    def queued(self) -> List[dict]:
+        """Queued jobs, highest priority first, then oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE status = 'queued' "
+                "ORDER BY priority DESC, created"
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def requeue_interrupted(self) -> int:
+        """Jobs left 'running' by a previous process (crash/restart) go back to the queue."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'requeued', updated = ? WHERE status = 'running'",
+                (time.time(),),
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def purge_finished(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(TERMINAL_STATUSES))}) AND updated < ?",
+                (*TERMINAL_STATUSES, older_than),
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+class JobQueue:
+    """
+    Background processing for uploaded files.
+
+    - A fixed pool of asyncio workers takes jobs from a priority queue
+      (higher priority first, FIFO within a priority)
+    - Job records and files are persisted in a JobStore; on start, queued jobs and
+      jobs interrupted by a restart are enqueued again
+    - cancel() drops queued jobs and cancels running ones
+    - subscribe() delivers a snapshot of the job on every status/stage change
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_queued: int):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self._handler: Optional[JobHandler] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "requeued": 0}
+
+    # ─── Lifecycle ───
+    def start(self, handler: JobHandler) -> None:
+        self._handler = handler
+        self._queue = asyncio.PriorityQueue()
+        self.store.purge_finished(time.time() - JOBS_RETENTION_SECONDS)
+        self.stats["requeued"] += self.store.requeue_interrupted()
+        for job in self.store.queued():
+            self._push(job)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stops the workers. Running jobs go back to 'queued' and resume on the next start."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    # ─── Public API ───
+    def check_capacity(self, count: int = 1) -> None:
+        """Raises unless count more jobs fit in the queue now (RuntimeError if it isn't running)."""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running.")
+        if self._queue.qsize() + count > self.max_queued:
+            raise QueueFullError("Job queue is full, try again later.")
+
+    async def submit(self, filename: str, file_bytes: bytes, params: dict, priority: int = 0) -> dict:
+        self.check_capacity()
+        job_id = str(uuid.uuid4())
+        await asyncio.to_thread(_write_file, self.store.file_path_for(job_id), file_bytes)
+        job = self.store.create(job_id, filename, params, priority)
+        self.stats["submitted"] += 1
+        self._push(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[dict]:
+        return self.store.list(status, limit)
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancels a queued or running job. Finished jobs are returned unchanged."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            # The worker records the cancellation once the task has unwound
+            self._cancel_requested.add(job_id)
+            task.cancel()
+            return job
+        # Still queued: the worker skips it when it comes up
+        _remove_file(job["file_path"])
+        self.stats["cancelled"] += 1
+        return self._update(job_id, status="cancelled", stage="cancelled")
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        watchers = self._watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[job_id]
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "running": len(self._running),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "by_status": self.store.counts(),
+        }
+
+    # ─── Internals ───
+    def _push(self, job: dict) -> None:
+        self._queue.put_nowait((-job["priority"], next(self._order), job["id"]))
+
+    def _update(self, job_id: str, **fields: Any) -> Optional[dict]:
+        job = self.store.update(job_id, **fields)
+        for queue in self._watchers.get(job_id, ()):
+            queue.put_nowait(job)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            job = self.store.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue  # cancelled while waiting
+            job = self._update(job_id, status="running", stage="starting")
+            task = asyncio.create_task(self._run(job))
+            self._running[job_id] = task
+            try:
+                # wait() instead of await: a cancelled job must not cancel the worker
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                # Shutdown: stop the job and leave it queued for the next start
+                task.cancel()
+                await asyncio.wait({task})
+                self._update(job_id, status="queued", stage="interrupted")
+                raise
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["id"]
+        try:
+            file_bytes = await asyncio.to_thread(_read_file, job["file_path"])
+            result = await self._handler(job, file_bytes, lambda stage: self._update(job_id, stage=stage))
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                self._cancel_requested.discard(job_id)
+                self.stats["cancelled"] += 1
+                self._update(job_id, status="cancelled", stage="cancelled")
+                _remove_file(job["file_path"])
+            return
+        except Exception as e:
+            logger.warning("Job %s failed: %s", job_id, e)
+            self.stats["failed"] += 1
+            self._update(job_id, status="failed", stage="failed", error=str(e))
+            _remove_file(job["file_path"])
+            return
+        self.stats["succeeded"] += 1
+        self._update(job_id, status="succeeded", stage="done", result=result)
+        _remove_file(job["file_path"])
+
+
+# Shared queue; started (with its handler) by the app lifespan
+job_queue = JobQueue(JobStore(JOBS_DIR), workers=JOBS_WORKERS, max_queued=JOBS_MAX_QUEUED)
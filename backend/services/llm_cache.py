@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_DISK_MAX_MB,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+# How often (in writes) the disk tier checks its size budget
+_EVICTION_CHECK_INTERVAL = 64
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Tier 1: bounded in-memory LRU (microsecond hits)
+    Tier 2: SQLite file that survives restarts (evicts oldest entries past the size budget)
+    Both tiers honour the same TTL.
+
+    Each tier has its own lock: memory lookups (done on the event loop) never wait
+    for a SQLite read, write or eviction running in a thread.
+    """
+
+    def __init__(self, path: Optional[str], memory_entries: int, disk_max_bytes: int, ttl_seconds: float):
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()     # memory tier and stats
+        self._db_lock = threading.Lock()  # SQLite connection
+        self._writes_since_check = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]]) -> str:
+        """Hash of model + messages, with whitespace normalized so cosmetic differences still hit."""
+        normalized = [
+            {"role": m["role"].strip().lower(), "content": " ".join(m["content"].split())}
+            for m in messages
+        ]
+        raw = json.dumps({"model": model, "messages": normalized}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def _get_memory(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+        return None
+
+    def get_memory(self, key: str) -> Optional[str]:
+        """Memory tier only, never touches SQLite: safe on the event loop. Misses aren't counted."""
+        with self._lock:
+            return self._get_memory(key, time.time())
+
+    def get(self, key: str) -> Optional[str]:
+        """Both tiers. Blocking on a memory miss (SQLite read): call via a thread from async code."""
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+            if value is not None:
+                return value
+
+        row = None
+        with self._db_lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+
+        with self._lock:
+            if row is not None and row[1] + self.ttl_seconds > now:
+                # Promote to memory so the next hit skips SQLite (unless a newer put got there first)
+                if key not in self._memory:
+                    self._remember(key, row[0], row[1] + self.ttl_seconds)
+                self.stats["disk_hits"] += 1
+                return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """Stores a response in both tiers. Blocking (SQLite write): call via a thread from async code."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now + self.ttl_seconds)
+            self.stats["writes"] += 1
+
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, size) VALUES (?, ?, ?, ?)",
+                (key, value, now, len(key) + len(value.encode("utf-8"))),
+            )
+            self._db.commit()
+            self._writes_since_check += 1
+            if self._writes_since_check >= _EVICTION_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict_disk(now)
+
+    def _evict_disk(self, now: float) -> None:
+        """Drops expired rows, then the oldest rows until the file is under its size budget."""
+        cursor = self._db.execute("DELETE FROM llm_cache WHERE created <= ?", (now - self.ttl_seconds,))
+        evicted = cursor.rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.disk_max_bytes:
+            excess = total - self.disk_max_bytes
+            freed = 0
+            doomed = []
+            for key, size in self._db.execute("SELECT key, size FROM llm_cache ORDER BY created"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._db.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+            evicted += len(doomed)
+        self._db.commit()
+        with self._lock:
+            self.stats["evictions"] += evicted
+
+    def get_stats(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Shared cache (None when disabled via LLM_CACHE_ENABLED=false)
+llm_cache: Optional[LLMCache] = (
+    LLMCache(
+        path=LLM_CACHE_PATH,
+        memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+        disk_max_bytes=int(LLM_CACHE_DISK_MAX_MB * 1024 * 1024),
+        ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    )
+    if LLM_CACHE_ENABLED
+    else None
+)
@@ -1,42 +1,95 @@
 import fitz  # PyMuPDF
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from config import PDF_PROCESS_WORKERS, PDF_PARALLEL_MIN_PAGES
 
-def _extract_text_sync(file_bytes: bytes) -> dict:
+# Process pool for CPU-bound extraction of large PDFs (created on first use)
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def read_pdf_metadata(file_bytes: bytes) -> dict:
+    """Reads title/author/page count without extracting any text."""
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        return {
+            "title": doc.metadata.get("title", "Untitled"),
+            "author": doc.metadata.get("author", "Unknown"),
+            "page_count": doc.page_count,
+        }
+    finally:
+        doc.close()
+
+
+def iter_pdf_pages(file_bytes: bytes) -> Iterator[dict]:
     """
-    Synchronous extraction logic (internal).
-    Takes raw PDF bytes, returns extracted text + metadata.
+    Yields {"page_number", "text"} one page at a time (blocking; run in a thread).
+    Only the current page's text is held in memory.
     """
     doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        for page_num in range(len(doc)):
+            yield {"page_number": page_num + 1, "text": doc[page_num].get_text()}
+    finally:
+        doc.close()
+
+
+# ─── Process-pool extraction (large PDFs) ────────────────
+def _extract_page_range(file_bytes: bytes, start: int, end: int) -> List[str]:
+    """Worker: opens its own copy of the document and extracts pages [start, end)."""
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        return [doc[page_num].get_text() for page_num in range(start, end)]
+    finally:
+        doc.close()
+
 
-    metadata = {
-        "title": doc.metadata.get("title", "Untitled"),
-        "author": doc.metadata.get("author", "Unknown"),
-        "page_count": doc.page_count,
-    }
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # 'spawn' avoids forking a process that already runs an event loop and threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PDF_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
 
-    full_text = ""
-    pages = []
 
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        page_text = page.get_text()  # Extracts all text from this page
-        pages.append({"page_number": page_num + 1, "text": page_text})
-        full_text += page_text + "\n"
+def shutdown_process_pool() -> None:
+    """Stops the extraction workers (called on app shutdown)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
-    doc.close()
 
-    return {
-        "metadata": metadata,
-        "full_text": full_text.strip(),
-        "pages": pages,
-    }
+def use_process_pool(page_count: int) -> bool:
+    return PDF_PROCESS_WORKERS > 0 and page_count >= PDF_PARALLEL_MIN_PAGES
 
 
-async def extract_text_from_pdf_async(file_bytes: bytes) -> dict:
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Splits pages into ~2 ranges per worker so a slow range doesn't leave workers idle."""
+    parts = max(1, min(page_count, workers * 2))
+    size = -(-page_count // parts)  # ceil division
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+async def aiter_pdf_pages_parallel(file_bytes: bytes, page_count: int) -> AsyncIterator[dict]:
     """
-    Async wrapper for PDF text extraction.
-    Offloads the blocking PyMuPDF call to a thread pool.
+    Extracts page ranges on the process pool and yields {"page_number", "text"} in page order.
+    Each worker receives the document bytes and opens its own copy.
     """
-    loop = asyncio.get_event_loop()
-    # Run blocking fitz.open in default executor
-    return await loop.run_in_executor(None, _extract_text_sync, file_bytes)
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    ranges = _page_ranges(page_count, PDF_PROCESS_WORKERS)
+    futures = [loop.run_in_executor(pool, _extract_page_range, file_bytes, start, end) for start, end in ranges]
+    try:
+        # Ranges finish out of order; awaiting them in order keeps the output ordered
+        for (start, _), future in zip(ranges, futures):
+            for offset, text in enumerate(await future):
+                yield {"page_number": start + offset + 1, "text": text}
+    finally:
+        for future in futures:
+            future.cancel()
+
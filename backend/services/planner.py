@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional
+from config import (
+    MODEL_NAME,
+    MODEL_LIMITS,
+    PACK_PROMPT_TOKENS,
+    PACK_MAX_CHUNKS_PER_CALL,
+    CHUNK_SIZE_TOKENS,
+    CHUNK_OVERLAP_TOKENS,
+    REDUCE_TOKEN_BUDGET,
+)
+
+# Unknown models get a conservative window
+DEFAULT_LIMITS = {"context": 8192, "output": 2048}
+
+# Instructions and separators around the packed texts
+PROMPT_OVERHEAD_TOKENS = 500
+
+# Smallest input budget worth planning for
+MIN_PROMPT_TOKENS = 1000
+
+
+def get_model_limits(model: str = MODEL_NAME) -> Dict[str, int]:
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+
+
+def plan_for_model(model: str = MODEL_NAME) -> Dict[str, int]:
+    """
+    Token budgets for one model:
+    - prompt_budget: input tokens per packed call (PACK_PROMPT_TOKENS, capped by the context
+      window minus room for the answer and instructions); documents under it skip the map phase
+    - chunk_size / chunk_overlap: chunk tokens, shrunk so one chunk always fits a prompt
+    - reduce_budget: max tokens merged per reduce call
+    - max_chunks_per_call: cap on chunks packed into one map call
+    """
+    limits = get_model_limits(model)
+    usable = limits["context"] - limits["output"] - PROMPT_OVERHEAD_TOKENS
+    prompt_budget = max(MIN_PROMPT_TOKENS, min(PACK_PROMPT_TOKENS, usable))
+    chunk_size = min(CHUNK_SIZE_TOKENS, prompt_budget)
+    return {
+        "model": model,
+        "context": limits["context"],
+        "output": limits["output"],
+        "prompt_budget": prompt_budget,
+        "chunk_size": chunk_size,
+        "chunk_overlap": min(CHUNK_OVERLAP_TOKENS, chunk_size // 10),
+        "reduce_budget": min(REDUCE_TOKEN_BUDGET, prompt_budget),
+        "max_chunks_per_call": PACK_MAX_CHUNKS_PER_CALL,
+    }
+
+
+# Plan for the configured model
+model_plan = plan_for_model()
+
+
+class BudgetPacker:
+    """
+    Incremental pack_by_budget, for items that arrive one at a time (e.g. chunks during upload).
+    add() returns the previous group once the new item no longer fits in it.
+    """
+
+    def __init__(self, token_budget: int, max_items: Optional[int] = None):
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self._current: List[Any] = []
+        self._tokens = 0
+
+    def add(self, item: Any, count: int) -> Optional[List[Any]]:
+        closed = None
+        if self._current and (
+            (self.max_items and len(self._current) >= self.max_items) or self._tokens + count > self.token_budget
+        ):
+            closed = self.finish()
+        self._current.append(item)
+        self._tokens += count
+        return closed
+
+    def finish(self) -> Optional[List[Any]]:
+        """The last, possibly partial group (None if empty)."""
+        closed = self._current or None
+        self._current, self._tokens = [], 0
+        return closed
+
+
+def pack_by_budget(counts: List[int], token_budget: int, max_items: Optional[int] = None) -> List[List[int]]:
+    """
+    Groups consecutive items (by index) so each group stays within token_budget tokens
+    and max_items items. An item larger than the budget gets a group of its own.
+    """
+    packer = BudgetPacker(token_budget, max_items)
+    groups = [group for group in (packer.add(index, count) for index, count in enumerate(counts)) if group]
+    last = packer.finish()
+    return groups + [last] if last else groups
+
+
+def needs_map_phase(total_tokens: int, plan: Dict[str, int] = model_plan) -> bool:
+    """Map-reduce only when the document doesn't fit one prompt; otherwise a single call is cheaper."""
+    # The single prompt joins the chunks, so overlapping tokens are sent twice
+    prompt_tokens = total_tokens * (1 + plan["chunk_overlap"] / plan["chunk_size"])
+    return prompt_tokens > plan["prompt_budget"]
@@ -1,60 +1,107 @@
 import re
+from typing import Dict, List
 
-def clean_text(text: str) -> str:
+# Compiled once at import, not per call
+_HEADING = re.compile(r"[A-Z][A-Z\s]{2,}")  # Detects ALL CAPS headings (matched against a stripped line)
+
+
+class StreamingPreprocessor:
     """
-    Cleans raw extracted text:
-    - Removes extra whitespace and newlines
-    - Removes common PDF artifacts (page numbers, headers/footers patterns)
-    - Normalizes unicode characters
+    Single-pass cleaner + structure detector. Feed raw text page by page; each feed()
+    returns the cleaned text it adds to the document, and finish() returns the sections.
+
+    Cleaning, applied line by line:
+    - Non-ASCII characters are dropped (e.g., curly quotes)
+    - Lines that are just page numbers (common PDF artifact) become blank
+    - Runs of spaces/tabs collapse to one space; lines are stripped
+    - Runs of blank lines collapse into one paragraph break ("\\n\\n"); a page break is a paragraph break
+    - No leading/trailing whitespace in the document
+
+    Headings are ALL CAPS lines. Sections are recorded as character offsets into the
+    cleaned text ({"heading", "start", "end"}, content only, heading line excluded),
+    so no section text is copied. Sections without content are dropped.
     """
-    # Normalize unicode (e.g., curly quotes → straight quotes)
-    text = text.encode("ascii", "ignore").decode("ascii")
 
-    # Remove lines that are just page numbers (common PDF artifact)
-    text = re.sub(r"^\s*\d+\s*$", "", text, flags=re.MULTILINE)
+    def __init__(self):
+        self.length = 0          # characters of cleaned text emitted so far
+        self._blank_pending = False
+        self._sections: List[Dict] = []
+        self._heading = "Introduction"
+        self._section_start = 0
+        self._section_has_content = False
+
+    def _close_section(self, end: int) -> None:
+        if self._section_has_content:
+            self._sections.append({"heading": self._heading, "start": self._section_start, "end": end})
+
+    def feed(self, text: str) -> str:
+        """Cleans one page of raw text; returns the cleaned text appended to the document."""
+        text = text.encode("ascii", "ignore").decode("ascii")
+        out = []
+        length = self.length
+        blank = self._blank_pending
+
+        for line in text.split("\n"):
+            stripped = line.strip()
+            # Blank and page-number-only lines only mark a paragraph break
+            if not stripped or stripped.isdigit():
+                blank = True
+                continue
+            if "  " in stripped or "\t" in stripped:
+                # split()/join is several times faster than a regex substitution per line
+                stripped = " ".join(stripped.split())
 
-    # Collapse multiple newlines into double newline (paragraph break)
-    text = re.sub(r"\n{3,}", "\n\n", text)
+            if length:
+                separator = "\n\n" if blank else "\n"
+                out.append(separator)
+                length += len(separator)
+            blank = False
 
-    # Collapse multiple spaces into one
-    text = re.sub(r" {2,}", " ", text)
+            # Cheap isupper() filter first; the regex runs only on candidate lines
+            if len(stripped) > 3 and stripped.isupper() and _HEADING.fullmatch(stripped):
+                self._close_section(length)
+                self._heading = stripped.title()
+                self._section_start = length + len(stripped)
+                self._section_has_content = False
+            else:
+                self._section_has_content = True
 
-    # Strip leading/trailing whitespace
-    text = text.strip()
+            out.append(stripped)
+            length += len(stripped)
 
-    return text
+        # A page break is a paragraph break
+        self._blank_pending = True
+        self.length = length
+        return "".join(out)
+
+    def finish(self) -> dict:
+        """Closes the last section and returns the document structure."""
+        self._close_section(self.length)
+        return {"sections": self._sections, "section_count": len(self._sections)}
+
+
+def section_text(text: str, section: Dict) -> str:
+    """The content of a section (offsets from StreamingPreprocessor / detect_structure)."""
+    return text[section["start"]:section["end"]].strip()
+
+
+def clean_text(text: str) -> str:
+    """
+    Cleans raw extracted text:
+    - Removes extra whitespace and newlines
+    - Removes common PDF artifacts (page numbers, headers/footers patterns)
+    - Normalizes unicode characters
+    """
+    return StreamingPreprocessor().feed(text)
 
 
 def detect_structure(text: str) -> dict:
     """
     Detects basic document structure.
-    Looks for headings (ALL CAPS lines, or lines followed by dashes).
-    Returns a list of detected sections.
+    Looks for headings (ALL CAPS lines).
+    Returns a list of detected sections with offsets into the text; the text is
+    expected to be cleaned already (clean_text output is left unchanged by cleaning).
     """
-    lines = text.split("\n")
-    sections = []
-    current_section = {"heading": "Introduction", "content": ""}
-
-    heading_pattern = re.compile(r"^[A-Z][A-Z\s]{2,}$")  # Detects ALL CAPS headings
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            current_section["content"] += "\n"
-            continue
-
-        # If line looks like a heading
-        if heading_pattern.match(stripped) and len(stripped) > 3:
-            # Save current section if it has content
-            if current_section["content"].strip():
-                sections.append(current_section)
-            # Start new section
-            current_section = {"heading": stripped.title(), "content": ""}
-        else:
-            current_section["content"] += stripped + "\n"
-
-    # Don't forget the last section
-    if current_section["content"].strip():
-        sections.append(current_section)
-
-    return {"sections": sections, "section_count": len(sections)}
+    preprocessor = StreamingPreprocessor()
+    preprocessor.feed(text)
+    return preprocessor.finish()
@@ -0,0 +1,439 @@
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from .http_client import get_http_client, record_request
+from .rate_limiter import LLMHTTPError, LLMScheduler, llm_scheduler
+from .telemetry import span, llm_request_seconds, record_llm_usage
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_BASE_URL,
+    GEMINI_MODEL,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+    LOCAL_LLM_BASE_URL,
+    LOCAL_LLM_MODEL,
+    LLM_PROVIDERS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_QUANTILE,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_HEDGE_MAX_DELAY,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_SAME_PROVIDER,
+    LLM_PROVIDER_MAX_FAILURES,
+    LLM_PROVIDER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fallback texts returned for malformed Gemini responses (never cached)
+ERROR_PREFIXES = ("Error: Gemini returned no candidates", "Error parsing Gemini response")
+
+# Recent latencies kept per backend for the hedge delay
+_LATENCY_WINDOW = 200
+
+
+def _parse_retry_after(response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _record_usage(prompt_tokens: Optional[int], output_tokens: Optional[int], prompt: str, text: str) -> None:
+    """Token counters for one API answer: the provider's usage numbers, else the ~4 chars/token estimate."""
+    record_llm_usage(
+        "api",
+        prompt_tokens if prompt_tokens is not None else len(prompt) // 4,
+        output_tokens if output_tokens is not None else len(text) // 4,
+    )
+
+
+class LLMProvider(ABC):
+    """
+    One LLM backend. generate() is a single HTTP round-trip (no retries: the scheduler
+    retries, the router hedges and fails over); stream() yields the answer in pieces.
+    Both raise LLMHTTPError on non-200 responses.
+    """
+
+    name = "provider"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)  # seconds, successful calls
+        self.consecutive_failures = 0
+        self.skip_until = 0.0
+
+    @abstractmethod
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        """The whole answer of one request."""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """The answer in pieces as they arrive (implemented as an async generator)."""
+
+    # ─── HTTP helpers ───
+    async def _post(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Any:
+        """POSTs JSON on the shared pooled client; returns the decoded body."""
+        client = get_http_client()
+        started = time.perf_counter()
+        try:
+            response = await client.post(url, json=payload, headers=headers)
+        except Exception:
+            llm_request_seconds.observe(time.perf_counter() - started, provider=self.name, status="error")
+            raise
+        elapsed = time.perf_counter() - started
+        record_request(elapsed)
+        llm_request_seconds.observe(elapsed, provider=self.name, status=str(response.status_code))
+        if response.status_code != 200:
+            raise LLMHTTPError(response.status_code, response.text, _parse_retry_after(response), self.name)
+        return response.json()
+
+    async def _stream_events(
+        self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Any]:
+        """POSTs JSON and yields the decoded data of every server-sent event."""
+        client = get_http_client()
+        started = time.perf_counter()
+        with span("llm_stream"):
+            async with client.stream("POST", url, json=payload, headers=headers) as response:
+                if response.status_code != 200:
+                    llm_request_seconds.observe(time.perf_counter() - started, provider=self.name, status=str(response.status_code))
+                    detail = (await response.aread()).decode("utf-8", "replace")
+                    raise LLMHTTPError(response.status_code, detail, _parse_retry_after(response), self.name)
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:") or line[5:].strip() == "[DONE]":
+                        continue
+                    try:
+                        yield json.loads(line[5:])
+                    except ValueError:
+                        continue  # keep-alive
+        elapsed = time.perf_counter() - started
+        record_request(elapsed)
+        llm_request_seconds.observe(elapsed, provider=self.name, status="200")
+
+    # ─── Health ───
+    def hedge_delay(self) -> float:
+        """Seconds before a call counts as slow: the configured quantile of recent latencies."""
+        if len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_MAX_DELAY
+        ordered = sorted(self.latencies)
+        quantile = ordered[min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_QUANTILE))]
+        return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, quantile))
+
+    def available(self, now: float) -> bool:
+        return now >= self.skip_until
+
+    def record_success(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= LLM_PROVIDER_MAX_FAILURES:
+            # Skip this backend for a while; calls go to the next one
+            self.skip_until = time.monotonic() + LLM_PROVIDER_COOLDOWN
+
+    def get_stats(self) -> dict:
+        ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+        return {
+            "provider": self.name,
+            "model": self.model,
+            "samples": len(ordered),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "consecutive_failures": self.consecutive_failures,
+            "available": self.available(time.monotonic()),
+        }
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini REST API (generateContent / streamGenerateContent)."""
+
+    name = "gemini"
+
+    def __init__(self, base_url: str, api_key: Optional[str], model: str):
+        super().__init__(model)
+        self.url = f"{base_url}/models/{model}:generateContent?key={api_key}"
+        self.stream_url = f"{base_url}/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+
+    @staticmethod
+    def build_payload(messages: List[Dict[str, str]]) -> Tuple[Dict[str, Any], str]:
+        """
+        Converts OpenAI-style messages to a Gemini request body.
+        Simple adapter: concatenate system + user for simplicity as Gemini system instructions vary by model version
+        """
+        full_prompt = ""
+        for msg in messages:
+            role = msg["role"]
+            content = msg["content"]
+            if role == "system":
+                full_prompt += f"System Instruction: {content}\n\n"
+            elif role == "user":
+                full_prompt += f"User: {content}\n\n"
+
+        payload = {
+            "contents": [{
+                "parts": [{"text": full_prompt}]
+            }]
+        }
+        return payload, full_prompt
+
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        payload, full_prompt = self.build_payload(messages)
+        data = await self._post(self.url, payload)
+        # Extract text from Gemini response
+        try:
+            # Structure: candidates[0].content.parts[0].text
+            text = data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            # Handle cases where response structure differs or is empty
+            if "candidates" in data and not data["candidates"]:
+                return "Error: Gemini returned no candidates (blocked content?)"
+            return f"Error parsing Gemini response: {str(data)}"
+        usage = data.get("usageMetadata") or {}
+        _record_usage(usage.get("promptTokenCount"), usage.get("candidatesTokenCount"), full_prompt, text)
+        return text
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        payload, full_prompt = self.build_payload(messages)
+        pieces, usage = [], {}  # the last event carries the usage totals
+        async for data in self._stream_events(self.stream_url, payload):
+            try:
+                usage = data.get("usageMetadata") or usage
+                text = data["candidates"][0]["content"]["parts"][0]["text"]
+            except (KeyError, IndexError, TypeError, AttributeError):
+                continue  # metadata-only event
+            pieces.append(text)
+            yield text
+        _record_usage(usage.get("promptTokenCount"), usage.get("candidatesTokenCount"), full_prompt, "".join(pieces))
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any OpenAI-compatible /chat/completions API: OpenAI itself, or a local server
+    (Ollama, llama.cpp, vLLM) serving the llama fallback.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: Optional[str], model: str):
+        super().__init__(model)
+        self.name = name
+        self.url = f"{base_url}/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        data = await self._post(self.url, {"model": self.model, "messages": messages}, self.headers)
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            # Unlike Gemini's fallback text, raise so the router can fail over
+            raise RuntimeError(f"Unexpected {self.name} response: {str(data)[:200]}")
+        usage = data.get("usage") or {}
+        prompt = "".join(m["content"] for m in messages)
+        _record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"), prompt, text)
+        return text
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        payload = {"model": self.model, "messages": messages, "stream": True}
+        pieces, usage = [], {}
+        async for data in self._stream_events(self.url, payload, self.headers):
+            try:
+                usage = data.get("usage") or usage
+                text = data["choices"][0]["delta"].get("content")
+            except (KeyError, IndexError, TypeError, AttributeError):
+                continue
+            if text:
+                pieces.append(text)
+                yield text
+        prompt = "".join(m["content"] for m in messages)
+        _record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"), prompt, "".join(pieces))
+
+
+def build_provider(name: str) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider(GEMINI_BASE_URL, GEMINI_API_KEY, GEMINI_MODEL)
+    if name == "openai":
+        return OpenAICompatibleProvider("openai", OPENAI_BASE_URL, OPENAI_API_KEY, OPENAI_MODEL)
+    if name == "local":
+        return OpenAICompatibleProvider("local", LOCAL_LLM_BASE_URL, None, LOCAL_LLM_MODEL)
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+class LLMRouter:
+    """
+    Sends each call to the first available backend, then:
+    - Hedging: if the call is still running after the backend's hedge delay (its p95
+      latency, see LLMProvider.hedge_delay), a second request goes to the next backend
+      (or, with only one backend, the same one again, i.e. another replica). The first
+      answer wins and the other request is cancelled, so one slow call can't stall a
+      whole map or reduce step.
+    - Failover: if a request fails and nothing else is in flight, the next backend is
+      tried right away. Backends that keep failing are skipped for a cooldown.
+    Raises the last error when every backend failed (the scheduler decides about retries).
+
+    The caller holds one scheduler slot for the whole call. Extra requests are charged
+    to the scheduler too: a hedge needs its own free slot and rate budget (it is skipped
+    otherwise), a failover takes rate budget and reuses the slot of the failed attempt.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_enabled: bool = True,
+        hedge_same_provider: bool = True,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
+        if not providers:
+            raise ValueError("At least one LLM provider is required.")
+        self.providers = providers
+        self.hedge_enabled = hedge_enabled
+        self.hedge_same_provider = hedge_same_provider
+        self.scheduler = scheduler
+        self.stats = {"calls": 0, "hedges": 0, "hedges_skipped": 0, "hedge_wins": 0, "failovers": 0, "failures": 0}
+
+    @property
+    def primary(self) -> LLMProvider:
+        return self.providers[0]
+
+    def _ordered(self) -> List[LLMProvider]:
+        """Available backends in priority order; skipped ones last (still better than failing outright)."""
+        now = time.monotonic()
+        return sorted(self.providers, key=lambda p: not p.available(now))
+
+    async def _attempt(self, provider: LLMProvider, messages: List[Dict[str, str]]) -> str:
+        started = time.perf_counter()
+        try:
+            with span("llm_call"):
+                text = await provider.generate(messages)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race: not a failure
+        except Exception:
+            provider.record_failure()
+            raise
+        provider.record_success(time.perf_counter() - started)
+        return text
+
+    async def _failover_attempt(self, provider: LLMProvider, messages: List[Dict[str, str]], estimated_tokens: int) -> str:
+        if self.scheduler is not None:
+            await self.scheduler.charge(estimated_tokens)
+        return await self._attempt(provider, messages)
+
+    async def generate(self, messages: List[Dict[str, str]], estimated_tokens: int = 0) -> str:
+        """estimated_tokens: what the scheduler charges for each extra (hedge or failover) request."""
+        self.stats["calls"] += 1
+        candidates = self._ordered()
+        first = candidates[0]
+        next_index = 1
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        errors: List[Exception] = []
+        hedge_at = time.perf_counter() + first.hedge_delay() if self.hedge_enabled else None
+
+        def launch(provider: LLMProvider, attempt) -> asyncio.Task:
+            task = asyncio.create_task(attempt)
+            pending[task] = provider
+            return task
+
+        first_task = launch(first, self._attempt(first, messages))
+        try:
+            while pending:
+                timeout = None
+                if hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.perf_counter())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slow call: hedge once, on the next backend or another replica of this one
+                    hedge_at = None
+                    if next_index < len(candidates):
+                        target = candidates[next_index]
+                    elif self.hedge_same_provider:
+                        target = first
+                    else:
+                        continue
+                    if self.scheduler is not None and not self.scheduler.try_acquire_extra(estimated_tokens):
+                        # No spare capacity: keep waiting (the next backend stays available for failover)
+                        self.stats["hedges_skipped"] += 1
+                        continue
+                    if next_index < len(candidates):
+                        next_index += 1
+                    self.stats["hedges"] += 1
+                    hedge = launch(target, self._attempt(target, messages))
+                    if self.scheduler is not None:
+                        # A callback, so the slot comes back even if the task is cancelled before it starts
+                        hedge.add_done_callback(lambda _: self.scheduler.release_extra())
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is None:
+                        if task is not first_task:
+                            self.stats["hedge_wins" if first_task in pending else "failovers"] += 1
+                        return task.result()
+                    error = task.exception()
+                    errors.append(error)
+                    logger.warning("LLM provider %s failed: %s", provider.name, error)
+
+                # Nothing left in flight: fail over to the next backend right away
+                if not pending and next_index < len(candidates):
+                    target = candidates[next_index]
+                    launch(target, self._failover_attempt(target, messages, estimated_tokens))
+                    next_index += 1
+                    hedge_at = None
+
+            self.stats["failures"] += 1
+            raise errors[-1]
+        finally:
+            for task in pending:
+                if task.done():
+                    task.cancelled() or task.exception()  # finished alongside the winner: mark as retrieved
+                else:
+                    task.cancel()
+
+    async def stream(self, messages: List[Dict[str, str]], estimated_tokens: int = 0) -> AsyncIterator[str]:
+        """
+        Streams from the first available backend, failing over while nothing has been
+        sent yet. Streams aren't hedged: output can't be taken back once it reached the client.
+        """
+        self.stats["calls"] += 1
+        last_error: Optional[Exception] = None
+        for index, provider in enumerate(self._ordered()):
+            if index > 0 and self.scheduler is not None:
+                await self.scheduler.charge(estimated_tokens)
+            sent = False
+            try:
+                async for piece in provider.stream(messages):
+                    sent = True
+                    yield piece
+            except Exception as e:
+                provider.record_failure()
+                if sent:
+                    raise
+                logger.warning("LLM provider %s failed: %s", provider.name, e)
+                last_error = e
+                continue
+            # Stream durations follow the answer length, so they don't feed the hedge delay
+            provider.consecutive_failures = 0
+            if index > 0:
+                self.stats["failovers"] += 1
+            return
+        self.stats["failures"] += 1
+        raise last_error
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "providers": [provider.get_stats() for provider in self.providers]}
+
+
+# Backends in LLM_PROVIDERS order, shared by every call in this process
+llm_router = LLMRouter(
+    [build_provider(name) for name in LLM_PROVIDERS],
+    hedge_enabled=LLM_HEDGE_ENABLED,
+    hedge_same_provider=LLM_HEDGE_SAME_PROVIDER,
+    scheduler=llm_scheduler,
+)
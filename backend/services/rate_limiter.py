@@ -0,0 +1,279 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+import httpx
+from config import (
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MIN_CONCURRENCY,
+    LLM_INITIAL_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+)
+
+# Which session an LLM call belongs to (set per request in main.py).
+# Tasks spawned with asyncio.gather inherit it, so map-phase fan-out is attributed correctly.
+current_session: ContextVar[str] = ContextVar("llm_session", default="anonymous")
+
+
+class LLMHTTPError(RuntimeError):
+    """Non-200 response from the LLM API, keeping the status for retry decisions."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None, provider: str = "gemini"):
+        super().__init__(f"{provider.title()} API Error {status_code}: {detail}")
+        self.status_code = status_code
+        self.provider = provider
+        self.retry_after = retry_after
+
+    @property
+    def is_overload(self) -> bool:
+        """429 and 5xx mean the backend is saturated; anything else is our fault."""
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class TokenBucket:
+    """Continuous-refill token bucket sized as 'units per minute'."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until 'amount' units are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # a single oversized request must still pass eventually
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """
+    Process-wide gate in front of every LLM call.
+
+    - Rate limiting: two token buckets (requests/minute and tokens/minute)
+    - Adaptive concurrency (AIMD): +1/limit per success, halved on 429/5xx
+    - Retries: jittered exponential backoff, honouring Retry-After
+    - Fairness: one FIFO queue per session, served round-robin, so a huge
+      document cannot starve smaller requests from other users
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        decrease_cooldown: float = 1.0,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min_concurrency)
+        self.limit = float(initial_concurrency or max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._order: Deque[str] = deque()  # round-robin order of sessions with waiters
+        self._last_decrease = 0.0
+        self.stats = {"calls": 0, "retries": 0, "overloads": 0, "failures": 0}
+
+    # ─── Fair concurrency slots ─────────────────────────
+    def _dispatch(self) -> None:
+        """Hands free slots to waiting sessions in round-robin order."""
+        while self.in_flight < max(self.min_concurrency, int(self.limit)) and self._order:
+            session = self._order.popleft()
+            queue = self._queues[session]
+            waiter = queue.popleft()
+            if queue:
+                self._order.append(session)  # back of the line for its next call
+            else:
+                del self._queues[session]
+            if waiter.cancelled():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    async def _acquire_slot(self, session: str) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        if session not in self._queues:
+            self._queues[session] = deque()
+            self._order.append(session)
+        self._queues[session].append(waiter)
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Slot was granted just before cancellation: give it back
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    # ─── Extra requests of one call (router hedges and failovers) ─
+    def try_acquire_extra(self, estimated_tokens: int) -> bool:
+        """
+        Takes a slot and rate budget for a hedge request, only if both are free right now and
+        no session is waiting. Hedges are optional, so they never queue: they can't delay other
+        sessions or wait behind the very call they would speed up. Pair with release_extra().
+        """
+        if self._order or self.in_flight >= max(self.min_concurrency, int(self.limit)):
+            return False
+        now = time.monotonic()
+        if self.request_bucket.delay_for(1, now) > 0 or self.token_bucket.delay_for(estimated_tokens, now) > 0:
+            return False
+        self.request_bucket.take(1)
+        self.token_bucket.take(estimated_tokens)
+        self.in_flight += 1
+        self.stats["calls"] += 1
+        return True
+
+    def release_extra(self) -> None:
+        self._release_slot()
+
+    async def charge(self, estimated_tokens: int) -> None:
+        """Rate budget for a failover request, sent in the slot its failed attempt held."""
+        await self._reserve_budget(estimated_tokens)
+        self.stats["calls"] += 1
+
+    # ─── Rate limiting ──────────────────────────────────
+    async def _reserve_budget(self, estimated_tokens: int) -> None:
+        while True:
+            now = time.monotonic()
+            wait = max(
+                self.request_bucket.delay_for(1, now),
+                self.token_bucket.delay_for(estimated_tokens, now),
+            )
+            if wait <= 0:
+                self.request_bucket.take(1)
+                self.token_bucket.take(estimated_tokens)
+                return
+            await asyncio.sleep(wait)
+
+    # ─── AIMD ───────────────────────────────────────────
+    def _on_success(self) -> None:
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+        self._dispatch()
+
+    def _on_overload(self) -> None:
+        self.stats["overloads"] += 1
+        now = time.monotonic()
+        # A burst of 429s from calls already in flight counts as one signal
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+            self._last_decrease = now
+
+    # ─── Retries ────────────────────────────────────────
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, LLMHTTPError):
+            return error.is_overload
+        return isinstance(error, httpx.TransportError)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(self.max_delay, retry_after)
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return cap / 2 + random.uniform(0, cap / 2)  # equal jitter
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int,
+        session_id: Optional[str] = None,
+    ) -> Any:
+        """Runs 'call' under the rate limits and concurrency limit, retrying transient failures."""
+        session = session_id or current_session.get()
+        attempt = 0
+        while True:
+            await self._acquire_slot(session)
+            try:
+                await self._reserve_budget(estimated_tokens)
+                self.stats["calls"] += 1
+                result = await call()
+            except Exception as e:
+                if isinstance(e, LLMHTTPError) and e.is_overload:
+                    self._on_overload()
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self.stats["retries"] += 1
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release_slot()
+            # Sleep outside the slot so other sessions can use it meanwhile
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def reserve(self, estimated_tokens: int, session_id: Optional[str] = None) -> AsyncIterator[None]:
+        """
+        Holds one slot (and its rate budget) for the duration of the block.
+        Used for streaming calls, which can't be retried transparently once output has started.
+        """
+        await self._acquire_slot(session_id or current_session.get())
+        try:
+            await self._reserve_budget(estimated_tokens)
+            self.stats["calls"] += 1
+            yield
+        except Exception as e:
+            if isinstance(e, LLMHTTPError) and e.is_overload:
+                self._on_overload()
+            self.stats["failures"] += 1
+            raise
+        else:
+            self._on_success()
+        finally:
+            self._release_slot()
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_sessions": len(self._queues),
+        }
+
+
+# Single scheduler shared by every request in this process
+llm_scheduler = LLMScheduler(
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    min_concurrency=LLM_MIN_CONCURRENCY,
+    initial_concurrency=LLM_INITIAL_CONCURRENCY,
+    max_retries=LLM_MAX_RETRIES,
+    base_delay=LLM_RETRY_BASE_DELAY,
+    max_delay=LLM_RETRY_MAX_DELAY,
+)
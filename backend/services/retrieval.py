@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+import numpy as np
+from .embeddings import embedding_batcher
+from .coherence import normalize_rows
+from config import RETRIEVAL_WINDOW_WORDS, RETRIEVAL_WINDOW_OVERLAP_WORDS
+
+
+def chunk_windows(chunk: str, window_words: int, overlap_words: int) -> List[str]:
+    """
+    Overlapping word windows covering the whole chunk, each short enough for the
+    embedding model (which only reads the start of a longer text).
+    """
+    words = chunk.split()
+    if len(words) <= window_words:
+        return [" ".join(words)]
+    step = max(1, window_words - overlap_words)
+    starts = range(0, len(words) - overlap_words, step)
+    return [" ".join(words[start:start + window_words]) for start in starts]
+
+
+async def build_chunk_index(
+    chunks: List[str],
+    window_words: int = RETRIEVAL_WINDOW_WORDS,
+    overlap_words: int = RETRIEVAL_WINDOW_OVERLAP_WORDS,
+) -> Dict[str, np.ndarray]:
+    """
+    Embeds every chunk once (at upload), window by window (see chunk_windows), so text
+    anywhere in a chunk can match a query:
+    - vectors: (n_windows, dim) float32 with unit-length rows, so scoring is one matrix-vector product
+    - chunk_ids: (n_windows,) int32, the chunk each window belongs to
+    """
+    windows, chunk_ids = [], []
+    for chunk_id, chunk in enumerate(chunks):
+        for window in chunk_windows(chunk, window_words, overlap_words):
+            windows.append(window)
+            chunk_ids.append(chunk_id)
+    return {
+        "vectors": normalize_rows(await embedding_batcher.embed(windows)),
+        "chunk_ids": np.asarray(chunk_ids, dtype=np.int32),
+    }
+
+
+def select_chunk_indices(
+    index: Dict[str, np.ndarray], query_vector: np.ndarray, n_chunks: int, top_k: int, neighbors: int = 0
+) -> List[int]:
+    """
+    Top-k chunks by cosine similarity to the query (a chunk scores as its best window),
+    each widened by `neighbors` adjacent chunks on both sides. Returned in document order,
+    without duplicates.
+    """
+    if n_chunks <= top_k:
+        return list(range(n_chunks))
+
+    window_scores = index["vectors"] @ normalize_rows(query_vector.reshape(1, -1))[0]
+    scores = np.full(n_chunks, -np.inf, dtype=np.float32)
+    np.maximum.at(scores, index["chunk_ids"], window_scores)
+    # argpartition: O(n) selection instead of sorting every score
+    hits = np.argpartition(-scores, top_k - 1)[:top_k]
+
+    selected = set()
+    for hit in hits.tolist():
+        selected.update(range(max(0, hit - neighbors), min(n_chunks, hit + neighbors + 1)))
+    return sorted(selected)
+
+
+async def retrieve_chunk_indices(
+    index: Optional[Dict[str, np.ndarray]],
+    query: str,
+    n_chunks: int,
+    top_k: int,
+    neighbors: int = 0,
+) -> List[int]:
+    """Indices of the chunks relevant to the query, in document order (all chunks when there is no index)."""
+    if index is None or not query or n_chunks <= top_k:
+        return list(range(n_chunks))
+    query_vector = (await embedding_batcher.embed([query]))[0]
+    return select_chunk_indices(index, query_vector, n_chunks, top_k, neighbors)
+
+
+def take_chunks(chunks: List[str], indices: List[int]) -> List[str]:
+    """Chunks at indices; the same list when nothing is filtered out."""
+    if len(indices) == len(chunks):
+        return chunks
+    return [chunks[i] for i in indices]
@@ -0,0 +1,131 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Bytes held by obj and everything it references through dicts, lists, tuples and sets.
+    Shared objects are counted once. NumPy arrays report their buffer via __sizeof__;
+    opaque objects (e.g. asyncio tasks) count only their own header.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class SessionStore:
+    """
+    Bounded store for per-session document data.
+
+    - Byte budget: total deep size of all sessions stays under max_bytes;
+      least-recently-used sessions are evicted first
+    - Idle TTL: sessions not read or written for idle_ttl seconds are dropped
+    - on_evict(session_id, data) runs for every removed session (e.g. to cancel its tasks)
+
+    Sizes are measured when a session is stored. Code that grows a stored session
+    in place should call refresh() afterwards so the accounting stays exact.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        idle_ttl: float,
+        on_evict: Optional[Callable[[str, dict], None]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, Tuple[dict, int, float]]" = OrderedDict()  # id -> (data, size, last_used)
+        self.bytes_held = 0
+        self.stats = {"evictions": 0, "expirations": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _remove(self, session_id: str) -> dict:
+        data, size, _ = self._sessions.pop(session_id)
+        self.bytes_held -= size
+        if self.on_evict is not None:
+            self.on_evict(session_id, data)
+        return data
+
+    def _expire(self, now: float) -> None:
+        # Oldest-used first, so we can stop at the first live session
+        while self._sessions:
+            session_id, (_, _, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._remove(session_id)
+            self.stats["expirations"] += 1
+
+    def get(self, session_id: str) -> Optional[dict]:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        data, size, _ = entry
+        self._sessions[session_id] = (data, size, now)
+        self._sessions.move_to_end(session_id)
+        return data
+
+    def put(self, session_id: str, data: dict) -> int:
+        """Stores (or replaces) a session and evicts LRU sessions past the byte budget. Returns its size."""
+        now = time.monotonic()
+        self._expire(now)
+        if session_id in self._sessions:
+            self._remove(session_id)
+
+        size = deep_sizeof(data)
+        self._sessions[session_id] = (data, size, now)
+        self.bytes_held += size
+        self._evict_over_budget(keep=session_id)
+        return size
+
+    def refresh(self, session_id: str) -> None:
+        """Re-measures a session after it was modified in place."""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        data, old_size, last_used = entry
+        size = deep_sizeof(data)
+        self._sessions[session_id] = (data, size, last_used)
+        self.bytes_held += size - old_size
+        self._evict_over_budget(keep=session_id)
+
+    def _evict_over_budget(self, keep: str) -> None:
+        # The session being written always stays, even if it alone exceeds the budget
+        while self.bytes_held > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                self._sessions.move_to_end(keep)
+                continue
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def pop(self, session_id: str) -> Optional[dict]:
+        if session_id not in self._sessions:
+            return None
+        return self._remove(session_id)
+
+    def get_stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "bytes_held": self.bytes_held,
+            "max_bytes": self.max_bytes,
+            **self.stats,
+        }
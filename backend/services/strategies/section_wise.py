@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 def get_section_prompt(sections: List[Dict], chunks: List[str]) -> List[Dict[str, str]]:
     """
@@ -30,3 +30,47 @@ Output Format:
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt}
     ]
+
+
+def get_single_section_prompt(heading: str, section_text: str) -> List[Dict[str, str]]:
+    """
+    Prompt for one section of a section-wise summary. Sections are summarized
+    independently (concurrently) and assembled in document order afterwards.
+    """
+    prompt = f"""You are an expert document analyst. Summarize the following section of a document.
+
+The summary must:
+- Be 2-4 sentences
+- Keep the key facts, figures and conclusions of this section
+- Be factually accurate — do NOT fabricate information not present in the text
+- Not repeat the section title
+
+Section title: {heading}
+
+Section content:
+{section_text}
+
+Section Summary:"""
+    return [{"role": "user", "content": prompt}]
+
+
+def get_packed_sections_prompt(sections: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+    """
+    Prompt for several short consecutive sections in one call: (heading, text) pairs in,
+    a JSON array with one summary per section out.
+    """
+    blocks = "\n\n".join(
+        f"### Section {i + 1}: {heading}\n{text}" for i, (heading, text) in enumerate(sections)
+    )
+    prompt = f"""You are an expert document analyst. Summarize each of the following {len(sections)} sections of a document separately.
+
+Each summary must:
+- Be 1-4 sentences (shorter for short sections)
+- Keep the key facts, figures and conclusions of that section
+- Be factually accurate — do NOT fabricate information not present in the text
+- Not repeat the section title
+
+Return ONLY a JSON array of exactly {len(sections)} strings, one summary per section, in order.
+
+{blocks}"""
+    return [{"role": "user", "content": prompt}]
@@ -0,0 +1,324 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Every exported metric name starts with this
+METRIC_PREFIX = "drishti_"
+
+# Latency buckets in seconds: covers in-process stages (ms) up to long map phases (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_INF_LABEL = 'le="+Inf"'
+
+# Summarization mode an LLM call is made for (set per request in main.py, like current_session)
+current_mode: ContextVar[str] = ContextVar("llm_mode", default="none")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = METRIC_PREFIX + name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. tokens sent per mode."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Latency distribution with cumulative buckets, Prometheus style."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [per-bucket counts, sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, key, f'le="{_format_number(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, _INF_LABEL)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_number(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text format by /metrics.
+
+    Besides its own counters/gauges/histograms it exports the stats dicts the services
+    already keep (scheduler, cache, embeddings, jobs, sessions) through collectors, so
+    those components need no changes: keys listed as counters become <name>_total,
+    every other numeric value a gauge.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Tuple[str, Callable[[], Optional[dict]], frozenset]] = []
+
+    def _get_or_create(self, cls, name: str, help_text: str, labels: Iterable[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def register_collector(self, name: str, get_stats: Callable[[], Optional[dict]], counters: Iterable[str] = ()) -> None:
+        """Exports get_stats() (a flat dict) at every scrape as <prefix><name>_<key>."""
+        self._collectors = [c for c in self._collectors if c[0] != name]
+        self._collectors.append((name, get_stats, frozenset(counters)))
+
+    def _render_collector(self, name: str, get_stats: Callable[[], Optional[dict]], counters: frozenset) -> List[str]:
+        stats = get_stats()
+        lines = []
+        for key, value in (stats or {}).items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f"{METRIC_PREFIX}{name}_{key}"
+            kind = "counter" if key in counters else "gauge"
+            if kind == "counter":
+                metric += "_total"
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {_format_number(value)}"]
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        for name, get_stats, counters in self._collectors:
+            lines += self._render_collector(name, get_stats, counters)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# ─── Core metrics ───────────────────────────────────────
+stage_seconds = metrics.histogram("stage_duration_seconds", "Time spent per pipeline stage.", ["stage"])
+stage_errors = metrics.counter("stage_errors_total", "Pipeline stages that raised.", ["stage"])
+failures = metrics.counter("failures_total", "Handled failures (the request continued without this part).", ["kind"])
+llm_request_seconds = metrics.histogram("llm_request_duration_seconds", "One HTTP round-trip to the LLM API.", ["provider", "status"])
+llm_calls = metrics.counter("llm_calls_total", "LLM calls by mode, answered by the API or the cache.", ["mode", "source"])
+llm_tokens = metrics.counter("llm_tokens_total", "LLM tokens by mode and direction (input/output).", ["mode", "direction"])
+map_deduplicated = metrics.counter("map_chunks_deduplicated_total", "Map-phase chunks not sent to the LLM: a near-duplicate's summary was reused.")
+http_seconds = metrics.histogram("http_request_duration_seconds", "API request latency.", ["method", "route", "status"])
+http_in_flight = metrics.gauge("http_requests_in_flight", "API requests being processed.")
+
+
+# ─── Per-request traces ─────────────────────────────────
+class Trace:
+    """Per-request timing breakdown: time and count per stage, plus LLM usage."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, list] = {}  # stage -> [count, seconds]
+        self.llm_calls = 0
+        self.tokens = {"input": 0, "output": 0}
+        self.deduplicated_chunks = 0
+
+    def add(self, stage: str, seconds: float) -> None:
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def breakdown(self) -> dict:
+        """
+        total_ms is wall time since the trace started. Stage times are summed over every
+        occurrence, so concurrent stages (e.g. map-phase LLM calls) can add up to more than the total.
+        """
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": {
+                stage: {"count": count, "total_ms": round(seconds * 1000, 1)}
+                for stage, (count, seconds) in self.stages.items()
+            },
+            "llm_calls": self.llm_calls,
+            "llm_tokens": dict(self.tokens),
+            "deduplicated_chunks": self.deduplicated_chunks,
+        }
+
+
+# Tasks spawned with asyncio.gather inherit it, so their stages land in the same trace
+current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def start_trace() -> Trace:
+    """Starts collecting a timing breakdown for the current request (and tasks it spawns)."""
+    trace = Trace()
+    current_trace.set(trace)
+    return trace
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    stage_seconds.observe(seconds, stage=stage)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Times a block as one occurrence of a stage (metrics + the current trace, if any)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_llm_usage(source: str, input_tokens: int = 0, output_tokens: int = 0) -> None:
+    """Counts one LLM call (source: "api" or "cache") and, for API calls, its tokens."""
+    mode = current_mode.get()
+    llm_calls.inc(mode=mode, source=source)
+    if source != "api":
+        return
+    llm_tokens.inc(input_tokens, mode=mode, direction="input")
+    llm_tokens.inc(output_tokens, mode=mode, direction="output")
+    trace = current_trace.get()
+    if trace is not None:
+        trace.llm_calls += 1
+        trace.tokens["input"] += input_tokens
+        trace.tokens["output"] += output_tokens
+
+
+def record_deduplicated(count: int) -> None:
+    """Counts map-phase chunks that reused a near-duplicate's summary instead of an LLM call."""
+    map_deduplicated.inc(count)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.deduplicated_chunks += count
+
+
+# ─── ASGI middleware ────────────────────────────────────
+class MetricsMiddleware:
+    """
+    Request latency per route (the route template, so /jobs/{job_id} is one series) and
+    requests in flight. Plain ASGI: streaming responses are timed until their last byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route_path(scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return getattr(route, "path", "unmatched")
+        from starlette.routing import Match
+        for candidate in scope["app"].routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return getattr(candidate, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            http_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=self._route_path(scope), status=str(status["code"]),
+            )
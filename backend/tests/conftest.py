@@ -0,0 +1,27 @@
+import pytest
+import tiktoken
+
+from services import chunker
+
+# Same pre-tokenizer as cl100k_base, but byte-level ranks only: builds offline
+_CL100K_PATTERN = (
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+
+@pytest.fixture
+def local_encoder(monkeypatch):
+    """
+    Byte-level stand-in for cl100k_base (one token per byte), so chunker tests don't
+    download the real encoding. Spans and boundaries are checked, not exact token counts.
+    """
+    encoder = tiktoken.Encoding(
+        name="local_bytes",
+        pat_str=_CL100K_PATTERN,
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+    monkeypatch.setattr(chunker, "get_encoder", lambda: encoder)
+    chunker._token_byte_lengths.cache_clear()
+    yield encoder
+    chunker._token_byte_lengths.cache_clear()
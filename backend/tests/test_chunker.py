@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from services.chunker import StreamingChunker, chunk_hash, split_document
+
+pytestmark = pytest.mark.usefixtures("local_encoder")
+
+WORDS = "revenue growth costs stable investment data supply chain customers pricing margin outlook risk".split()
+
+
+def make_text(paragraphs: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    for i in range(paragraphs):
+        if i % 7 == 0:
+            parts.append(f"SECTION {i // 7 + 1}")
+        sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize() + "." for _ in range(rng.randint(2, 6))]
+        parts.append(" ".join(sentences))
+    return "\n\n".join(parts)
+
+
+@pytest.mark.parametrize("content_defined", [False, True])
+def test_spans_match_chunks_and_cover_text(content_defined):
+    text = make_text(300)
+    result = split_document(text, chunk_size=200, chunk_overlap=20, content_defined=content_defined)
+    chunks, spans = result["chunks"], result["spans"]
+
+    assert len(chunks) > 5
+    assert len(spans) == len(chunks) == len(result["token_counts"]) == len(result["token_spans"])
+    for chunk, (start, end) in zip(chunks, spans):
+        assert chunk == text[start:end]
+        assert chunk == chunk.strip()
+    assert all(count <= 200 for count in result["token_counts"])
+
+    # Every non-whitespace character is inside some chunk
+    assert text[:spans[0][0]].strip() == ""
+    assert text[spans[-1][1]:].strip() == ""
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start and end < next_end
+        assert text[end:next_start].strip() == ""
+
+    assert result["token_spans"][0][0] == 0
+    assert result["token_spans"][-1][1] == result["total_tokens"]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        split_document("some text", chunk_size=100, chunk_overlap=100)
+
+
+def test_empty_text():
+    result = split_document("", chunk_size=100, chunk_overlap=10)
+    assert result["chunks"] == [] and result["total_tokens"] == 0
+
+
+def test_content_defined_boundaries_survive_an_early_edit():
+    text = make_text(300, seed=1)
+    edited = text.replace("\n\n", "\n\nAn inserted paragraph near the start of the document.\n\n", 1)
+    before = {chunk_hash(c) for c in split_document(text, 200, 20, content_defined=True)["chunks"]}
+    after = [chunk_hash(c) for c in split_document(edited, 200, 20, content_defined=True)["chunks"]]
+    # Chunks after the edit fall back in step with the original version
+    assert sum(h in before for h in after) >= 0.9 * len(after)
+
+
+def test_streaming_chunker_covers_the_same_text():
+    text = make_text(200, seed=2)
+    chunker = StreamingChunker(chunk_size=200, chunk_overlap=20)
+    emitted = []
+    for start in range(0, len(text), 1500):
+        emitted.extend(chunker.feed(text[start:start + 1500]))
+    emitted.extend(chunker.finish())
+
+    for chunk in emitted:
+        start, end = chunk["span"]
+        assert chunk["text"] == text[start:end]
+    spans = [chunk["span"] for chunk in emitted]
+    assert text[:spans[0][0]].strip() == "" and text[spans[-1][1]:].strip() == ""
+    for (_, end), (next_start, _) in zip(spans, spans[1:]):
+        assert text[end:next_start].strip() == ""
+    # BPE merges across piece edges can shift the count by a token per split
+    assert abs(chunker.total_tokens - split_document(text, 200, 20)["total_tokens"]) <= len(emitted)
@@ -0,0 +1,34 @@
+import threading
+
+from services.llm_cache import LLMCache
+
+
+def make_cache(tmp_path, memory_entries: int = 100) -> LLMCache:
+    return LLMCache(str(tmp_path / "cache.db"), memory_entries, disk_max_bytes=10**9, ttl_seconds=3600)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "value")
+    cache.close()
+
+    reopened = make_cache(tmp_path)
+    assert reopened.get_memory("key") is None
+    assert reopened.get("key") == "value"
+    assert reopened.get_memory("key") == "value"  # promoted
+    assert reopened.get("missing") is None
+    stats = reopened.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_memory_lookups_dont_wait_for_sqlite(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("key", "value")
+    result = []
+    # A SQLite write or eviction in progress holds the connection
+    with cache._db_lock:
+        reader = threading.Thread(target=lambda: result.append(cache.get_memory("key")))
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive()
+    assert result == ["value"]
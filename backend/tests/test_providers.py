@@ -0,0 +1,115 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+import pytest
+
+from services.providers import LLMProvider, LLMRouter
+from services.rate_limiter import LLMHTTPError, LLMScheduler
+
+
+class FakeProvider(LLMProvider):
+    """Answers after `delay` seconds, or raises `error`."""
+
+    def __init__(self, name: str, answer: str = "ok", delay: float = 0.0, error: Exception = None, hedge_after: float = 10.0):
+        super().__init__(model="fake")
+        self.name = name
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.hedge_after = hedge_after
+        self.calls = 0
+
+    async def generate(self, messages: List[Dict[str, str]]) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        for word in self.answer.split():
+            yield word
+
+    def hedge_delay(self) -> float:
+        return self.hedge_after
+
+
+MESSAGES = [{"role": "user", "content": "Summarize this."}]
+
+
+def make_scheduler(max_concurrency: int = 4) -> LLMScheduler:
+    return LLMScheduler(requests_per_minute=100_000, tokens_per_minute=100_000_000, max_concurrency=max_concurrency)
+
+
+def test_fails_over_to_the_next_backend():
+    broken = FakeProvider("broken", error=LLMHTTPError(503, "unavailable", provider="broken"))
+    backup = FakeProvider("backup", answer="from backup")
+    router = LLMRouter([broken, backup], hedge_enabled=False)
+
+    assert asyncio.run(router.generate(MESSAGES)) == "from backup"
+    assert (broken.calls, backup.calls) == (1, 1)
+    assert router.stats["failovers"] == 1
+    assert broken.consecutive_failures == 1
+
+
+def test_raises_the_last_error_when_every_backend_fails():
+    first = FakeProvider("first", error=LLMHTTPError(500, "boom", provider="first"))
+    second = FakeProvider("second", error=LLMHTTPError(429, "busy", provider="second"))
+    router = LLMRouter([first, second], hedge_enabled=False)
+
+    with pytest.raises(LLMHTTPError) as excinfo:
+        asyncio.run(router.generate(MESSAGES))
+    assert excinfo.value.status_code == 429
+    assert router.stats["failures"] == 1
+
+
+def test_failover_is_charged_to_the_scheduler():
+    scheduler = make_scheduler()
+    broken = FakeProvider("broken", error=LLMHTTPError(503, "unavailable", provider="broken"))
+    backup = FakeProvider("backup")
+    router = LLMRouter([broken, backup], hedge_enabled=False, scheduler=scheduler)
+
+    assert asyncio.run(router.generate(MESSAGES, estimated_tokens=100)) == "ok"
+    assert scheduler.stats["calls"] == 1  # the failover request; the first one is the caller's
+
+
+def test_slow_call_is_hedged_and_the_fast_answer_wins():
+    scheduler = make_scheduler()
+    slow = FakeProvider("slow", answer="slow", delay=1.0, hedge_after=0.01)
+    fast = FakeProvider("fast", answer="fast")
+    router = LLMRouter([slow, fast], scheduler=scheduler)
+
+    assert asyncio.run(router.generate(MESSAGES, estimated_tokens=100)) == "fast"
+    assert router.stats["hedges"] == 1 and router.stats["hedge_wins"] == 1
+    assert scheduler.in_flight == 0  # the hedge gave its slot back
+
+
+def test_hedge_is_skipped_without_spare_capacity_and_failover_still_works():
+    scheduler = make_scheduler(max_concurrency=1)
+    slow_broken = FakeProvider("slow", delay=0.05, hedge_after=0.01, error=LLMHTTPError(503, "unavailable", provider="slow"))
+    backup = FakeProvider("backup", answer="from backup")
+    router = LLMRouter([slow_broken, backup], scheduler=scheduler)
+
+    async def call():
+        # The caller's request holds the only slot
+        return await scheduler.run(lambda: router.generate(MESSAGES, estimated_tokens=100), 100)
+
+    assert asyncio.run(call()) == "from backup"
+    assert router.stats["hedges"] == 0 and router.stats["hedges_skipped"] == 1
+    assert router.stats["failovers"] == 1
+    assert scheduler.in_flight == 0
+
+
+def test_stream_fails_over_before_output_starts():
+    broken = FakeProvider("broken", error=LLMHTTPError(503, "unavailable", provider="broken"))
+    backup = FakeProvider("backup", answer="streamed from backup")
+    router = LLMRouter([broken, backup])
+
+    async def collect():
+        return [piece async for piece in router.stream(MESSAGES)]
+
+    assert asyncio.run(collect()) == ["streamed", "from", "backup"]
+    assert router.stats["failovers"] == 1
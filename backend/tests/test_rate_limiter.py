@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.rate_limiter import LLMHTTPError, LLMScheduler
+
+
+def make_scheduler(**overrides) -> LLMScheduler:
+    options = dict(
+        requests_per_minute=100_000,
+        tokens_per_minute=100_000_000,
+        max_concurrency=1,
+        max_retries=3,
+        base_delay=0.001,
+        max_delay=0.01,
+    )
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+def test_sessions_are_served_round_robin():
+    async def scenario():
+        scheduler = make_scheduler()
+        gate = asyncio.Event()
+        order = []
+
+        def call(label):
+            async def run():
+                order.append(label)
+                await gate.wait()
+                return label
+            return run
+
+        # Session "big" queues five calls, then "small" queues one while the first still runs
+        tasks = [asyncio.create_task(scheduler.run(call(f"big-{i}"), 10, session_id="big")) for i in range(5)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(scheduler.run(call("small"), 10, session_id="small")))
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    # "small" waits for one more call of "big" (already next in line), not for all of them
+    assert order == ["big-0", "big-1", "small", "big-2", "big-3", "big-4"]
+    assert scheduler.in_flight == 0
+    assert scheduler.get_stats()["queued"] == 0
+
+
+def test_concurrency_limit_is_respected():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=3)
+        running, peak = 0, 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+
+        await asyncio.gather(*[scheduler.run(call, 10, session_id=f"s{i % 4}") for i in range(20)])
+        return peak
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_overload_is_retried_and_halves_the_limit():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=8, decrease_cooldown=0)
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            if attempts <= 2:
+                raise LLMHTTPError(429, "slow down")
+            return "ok"
+
+        result = await scheduler.run(call, 10)
+        return result, attempts, scheduler
+
+    result, attempts, scheduler = asyncio.run(scenario())
+    assert result == "ok"
+    assert attempts == 3
+    assert scheduler.stats["retries"] == 2
+    assert scheduler.stats["overloads"] == 2
+    assert scheduler.limit < 8
+
+
+def test_transport_errors_are_retried():
+    async def scenario():
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise httpx.ConnectError("connection refused")
+            return "ok"
+
+        return await make_scheduler().run(call, 10), attempts
+
+    assert asyncio.run(scenario()) == ("ok", 2)
+
+
+def test_client_errors_are_not_retried():
+    async def scenario():
+        scheduler = make_scheduler()
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            raise LLMHTTPError(400, "bad request")
+
+        with pytest.raises(LLMHTTPError):
+            await scheduler.run(call, 10)
+        return attempts, scheduler
+
+    attempts, scheduler = asyncio.run(scenario())
+    assert attempts == 1
+    assert scheduler.stats["failures"] == 1
+    assert scheduler.in_flight == 0
+
+
+def test_retries_give_up_after_max_retries():
+    async def scenario():
+        scheduler = make_scheduler(max_retries=2)
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            raise LLMHTTPError(503, "unavailable")
+
+        with pytest.raises(LLMHTTPError):
+            await scheduler.run(call, 10)
+        return attempts, scheduler
+
+    attempts, scheduler = asyncio.run(scenario())
+    assert attempts == 3
+    assert scheduler.in_flight == 0
+
+
+def test_extra_requests_only_use_spare_capacity():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=2)
+        assert scheduler.try_acquire_extra(10)
+        assert scheduler.try_acquire_extra(10)
+        assert not scheduler.try_acquire_extra(10)  # no free slot: the hedge is skipped
+        scheduler.release_extra()
+        scheduler.release_extra()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.in_flight == 0
+    assert scheduler.stats["calls"] == 2
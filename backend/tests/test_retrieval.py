@@ -0,0 +1,58 @@
+import asyncio
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from services import retrieval
+from services.retrieval import build_chunk_index, chunk_windows, retrieve_chunk_indices
+
+MODEL_MAX_WORDS = 40
+DIM = 256
+
+
+async def fake_embed(texts):
+    """Bag-of-words vectors that, like the real model, only read the start of each text."""
+    vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower())[:MODEL_MAX_WORDS]:
+            vectors[row, zlib.crc32(word.encode()) % DIM] += 1
+    return vectors
+
+
+@pytest.fixture(autouse=True)
+def local_embeddings(monkeypatch):
+    monkeypatch.setattr(retrieval.embedding_batcher, "embed", fake_embed)
+
+
+def filler(seed: int, words: int) -> str:
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"filler{i}" for i in range(500)]
+    return " ".join(rng.choice(vocabulary, words))
+
+
+def test_windows_cover_every_word():
+    chunk = " ".join(f"w{i}" for i in range(1000))
+    windows = chunk_windows(chunk, window_words=150, overlap_words=30)
+    assert all(len(window.split()) <= 150 for window in windows)
+    assert windows[0].split()[0] == "w0" and windows[-1].split()[-1] == "w999"
+    covered = {word for window in windows for word in window.split()}
+    assert covered == set(chunk.split())
+    assert chunk_windows("short chunk", 150, 30) == ["short chunk"]
+
+
+def test_answer_at_the_end_of_a_chunk_is_retrieved():
+    chunks = [filler(i, 400) for i in range(10)]
+    chunks[7] += " The warranty covers water damage for three years."
+    query = "How many years does the warranty cover water damage"
+
+    async def scenario():
+        index = await build_chunk_index(chunks, window_words=30, overlap_words=5)
+        return await retrieve_chunk_indices(index, query, len(chunks), top_k=1)
+
+    assert asyncio.run(scenario()) == [7]
+
+
+def test_without_an_index_every_chunk_is_used():
+    assert asyncio.run(retrieve_chunk_indices(None, "anything", 5, top_k=2)) == [0, 1, 2, 3, 4]
@@ -0,0 +1,40 @@
+"""
+Import-time budget for the API module: main.py is imported in a fresh interpreter,
+must load within STARTUP_BUDGET_SECONDS (best of 3) and must not import heavy ML
+libraries eagerly (the embedding model loads lazily / in the background).
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+# Modules that must not be imported just by importing the app
+FORBIDDEN_MODULES = ["sentence_transformers", "torch", "transformers"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FORBIDDEN_MODULES,)
+
+
+def measure_once() -> dict:
+    env = dict(os.environ, EMBEDDING_WARMUP="false")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_main_is_fast_and_lazy():
+    # Best of 3: the first run includes a cold disk cache
+    runs = [measure_once() for _ in range(3)]
+    assert all(not run["loaded"] for run in runs), f"heavy modules imported eagerly: {runs[0]['loaded']}"
+    best = min(run["seconds"] for run in runs)
+    assert best <= BUDGET_SECONDS, f"import main took {best:.3f}s (budget {BUDGET_SECONDS:.3f}s)"
@@ -1,4 +1,4 @@
-import { Zap, FileText, List, Layers, Search } from 'lucide-react';
+import { Zap, FileText, List, Layers, Search, Highlighter } from 'lucide-react';
 
 const MODES = [
     {
@@ -36,6 +36,13 @@ const MODES = [
         icon: Search,
         color: 'blue',
     },
+    {
+        id: 'extractive',
+        name: 'Extractive',
+        description: 'Key sentences picked from the document, instantly and offline',
+        icon: Highlighter,
+        color: 'green',
+    },
 ];
 
 export default function ModeSelector({ selectedMode, onModeSelect, onQueryChange, query }) {